@@ -1,36 +1,128 @@
-import subprocess
 import json
 import time
+import random
+import asyncio
+import logging
+import urllib.request
+
+# Worker liveness is probed with a TCP connect to the shard server port
+DEFAULT_PORT = 7070
 
 class NodeMonitor:
-    def __init__(self, nodes):
+    def __init__(self, nodes, port=DEFAULT_PORT, timeout=2.0, interval=30, jitter=1.0,
+                 concurrency=256, sensu_url=None, sensu_api_key=None, sensu_namespace='default',
+                 sensu_concurrency=16):
+        """nodes: [{'name', 'ip'}] with an optional per-node 'port'"""
         self.nodes = nodes
         self.status = {}
-        
-    def check_node_health(self, node_ip):
-        """Check if node is responsive"""
+        self.port = port
+        self.timeout = timeout
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.sensu_url = sensu_url
+        self.sensu_api_key = sensu_api_key
+        self.sensu_namespace = sensu_namespace
+        self.sensu_concurrency = sensu_concurrency
+        self.logger = logging.getLogger(__name__)
+
+    async def probe(self, node_ip, port=None):
+        """Check if node is responsive: a TCP connect within the timeout"""
         try:
-            result = subprocess.run(
-                ['ping', '-c', '1', node_ip],
-                capture_output=True,
-                timeout=5
-            )
-            return result.returncode == 0
-        except subprocess.TimeoutExpired:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(node_ip, port or self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError):
             return False
-            
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
+
+    def check_node_health(self, node_ip):
+        """Check if node is responsive"""
+        return asyncio.run(self.probe(node_ip))
+
+    async def _probe_node(self, node, limit):
+        # Jitter spreads the connects of a sweep instead of bursting them
+        await asyncio.sleep(random.uniform(0, self.jitter))
+        async with limit:
+            start_time = time.monotonic()
+            is_healthy = await self.probe(node['ip'], node.get('port'))
+        self.status[node['name']] = {
+            'healthy': is_healthy,
+            'last_checked': time.time(),
+            'latency': time.monotonic() - start_time,
+        }
+
+    async def probe_all(self):
+        """Probe every node concurrently; a sweep takes about jitter + timeout"""
+        limit = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._probe_node(node, limit) for node in self.nodes))
+        return self.status
+
     def monitor_nodes(self):
         """Monitor all nodes and update status"""
-        for node in self.nodes:
-            is_healthy = self.check_node_health(node['ip'])
-            self.status[node['name']] = {
-                'healthy': is_healthy,
-                'last_checked': time.time()
-            }
-            
-        return self.status
-        
+        return asyncio.run(self.probe_all())
+
+    def _sensu_event(self, name, node_status):
+        healthy = node_status['healthy']
+        return {
+            'entity': {
+                'entity_class': 'proxy',
+                'metadata': {'name': name, 'namespace': self.sensu_namespace},
+            },
+            'check': {
+                'metadata': {'name': 'node-liveness', 'namespace': self.sensu_namespace},
+                'status': 0 if healthy else 2,
+                'output': f"{name} {'reachable' if healthy else 'unreachable'}",
+                'executed': int(node_status['last_checked']),
+                'interval': self.interval,
+                'handlers': [],
+            },
+        }
+
+    def _post_event(self, event):
+        request = urllib.request.Request(
+            f"{self.sensu_url}/api/core/v2/namespaces/{self.sensu_namespace}/events",
+            data=json.dumps(event).encode(),
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        if self.sensu_api_key:
+            request.add_header('Authorization', f"Key {self.sensu_api_key}")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return 200 <= response.status < 300
+
+    async def submit_events(self, node_status):
+        """Post one Sensu event per node as a single concurrent batch; returns the number accepted"""
+        if not self.sensu_url:
+            self.logger.debug("No Sensu URL configured; skipping event submission")
+            return 0
+        limit = asyncio.Semaphore(self.sensu_concurrency)
+
+        async def submit(name, status):
+            async with limit:
+                try:
+                    return await asyncio.to_thread(self._post_event, self._sensu_event(name, status))
+                except Exception as e:
+                    self.logger.error(f"Failed to send Sensu event for {name}: {e}")
+                    return False
+
+        results = await asyncio.gather(*(submit(name, status) for name, status in node_status.items()))
+        return sum(results)
+
     def notify_sensu(self, node_status):
         """Send node status to Sensu API"""
-        # Implementation for sending data to Sensu API
-        pass 
\ No newline at end of file
+        return asyncio.run(self.submit_events(node_status))
+
+    async def run(self):
+        """Probe and report every interval (with jitter) until cancelled"""
+        while True:
+            status = await self.probe_all()
+            down = [name for name, node_status in status.items() if not node_status['healthy']]
+            if down:
+                self.logger.warning(f"Unreachable nodes: {down}")
+            await self.submit_events(status)
+            await asyncio.sleep(max(self.interval - self.jitter, 0) + random.uniform(0, self.jitter))
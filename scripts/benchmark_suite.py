@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""Offline RAID throughput benchmarks with stored results
+
+Generates a reproducible synthetic dataset (images across sizes and
+channel layouts, plus raw byte objects) and measures the throughput of
+every RAIDManager code path: encode, parity, degraded read and full node
+rebuild. Each run is written to test_results/benchmarks/ as JSON and
+compared with a stored baseline so regressions fail the run:
+
+    python scripts/benchmark_suite.py --save-baseline
+    python scripts/benchmark_suite.py            # exits 1 on regression
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.raid_manager import RAIDManager
+from storage.erasure import ErasureCoder
+from storage.shard_store import ShardStore
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'test_results', 'benchmarks')
+
+# (name, height, width, PIL mode) - sizes span thumbnails to camera images
+IMAGE_CASES = [
+    ('small_l', 256, 256, 'L'),
+    ('small_rgb', 256, 256, 'RGB'),
+    ('medium_rgb', 768, 1024, 'RGB'),
+    ('medium_rgba', 768, 1024, 'RGBA'),
+    ('large_rgb', 1536, 2048, 'RGB'),
+]
+QUICK_IMAGE_CASES = IMAGE_CASES[:3]
+
+# (name, size in bytes, compressible)
+BYTES_CASES = [
+    ('bytes_64k', 64 * 1024, False),
+    ('bytes_1m', 1024 * 1024, False),
+    ('bytes_8m_text', 8 * 1024 * 1024, True),
+]
+QUICK_BYTES_CASES = BYTES_CASES[:2]
+
+CHANNELS = {'L': 1, 'RGB': 3, 'RGBA': 4}
+
+
+def make_dataset(root, quick=False, seed=0):
+    """Write the synthetic dataset (deterministic for a seed); returns {name: (path, mode)}"""
+    os.makedirs(root, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dataset = {}
+    for name, height, width, mode in (QUICK_IMAGE_CASES if quick else IMAGE_CASES):
+        path = os.path.join(root, f"{name}.png")
+        if not os.path.exists(path):
+            # Smooth gradients plus noise, closer to photos than pure noise
+            shape = (height, width) if mode == 'L' else (height, width, CHANNELS[mode])
+            gradient = np.add.outer(np.arange(height), np.arange(width)) % 256
+            if mode != 'L':
+                gradient = gradient[..., None]
+            pixels = (gradient + rng.integers(0, 32, shape)).astype(np.uint8)
+            Image.fromarray(pixels, mode).save(path)
+        dataset[name] = (path, 'image')
+
+    for name, size, compressible in (QUICK_BYTES_CASES if quick else BYTES_CASES):
+        path = os.path.join(root, f"{name}.bin")
+        if not os.path.exists(path):
+            if compressible:
+                words = rng.choice([b'stripe ', b'parity ', b'shard ', b'node ', b'\n'], size // 6 + 1)
+                data = b''.join(words)[:size]
+            else:
+                data = rng.integers(0, 256, size, dtype=np.uint8).tobytes()
+            with open(path, 'wb') as f:
+                f.write(data)
+        dataset[name] = (path, 'bytes')
+    return dataset
+
+
+def best_time(func, repeat):
+    """Minimum wall time of func over repeat runs (least noisy estimate)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def _lose(shards, lost):
+    return [None if i in lost else shard for i, shard in enumerate(shards)]
+
+
+def benchmark_object(storage_path, path, mode, data_shards, parity_shards, repeat):
+    """MB/s of each RAIDManager path for one object and stripe geometry"""
+    raid_manager = RAIDManager(storage_path, data_shards=data_shards,
+                               parity_shards=parity_shards, mode=mode)
+    segments, descriptor = raid_manager.encode_object(path)
+    parities = raid_manager.encode(segments, descriptor)
+    shards = list(segments) + list(parities)
+    nbytes = descriptor.size
+    out = [np.empty_like(segments[0]) for _ in parities]
+
+    cases = {
+        'encode': lambda: raid_manager.encode_object(path),
+        'parity': lambda: raid_manager.encode(segments, descriptor, out=out),
+    }
+    if parity_shards == 1:
+        cases['parity_raid5'] = lambda: raid_manager.calculate_parity_raid5(segments, out=out[0])
+        cases['degraded_read'] = lambda: raid_manager.reconstruct_object(
+            raid_manager.recover_raid5(_lose(segments, {0}), parities[0]), descriptor)
+    elif parity_shards == 2:
+        cases['parity_raid6'] = lambda: raid_manager.calculate_parity_raid6(segments, out=out)
+        cases['degraded_read'] = lambda: raid_manager.reconstruct_object(
+            raid_manager.recover_raid6(_lose(segments, {0, 1}), parities), descriptor)
+    else:
+        cases['degraded_read'] = lambda: raid_manager.reconstruct_object(
+            raid_manager.decode(_lose(shards, set(range(parity_shards))), descriptor), descriptor)
+    if mode == 'image':
+        cases['stream_stripes'] = lambda: sum(1 for _ in raid_manager.iter_image_stripes(path))
+
+    return {name: nbytes / best_time(func, repeat) / 1e6 for name, func in cases.items()}
+
+
+def benchmark_rebuild(storage_path, dataset, data_shards, parity_shards, repeat):
+    """MB/s of rebuilding one worker's shards of every object from disk"""
+    store = ShardStore(storage_path)
+    coder = ErasureCoder(data_shards, parity_shards)
+    stored = []
+    for name, (path, mode) in dataset.items():
+        raid_manager = RAIDManager(storage_path, data_shards=data_shards,
+                                   parity_shards=parity_shards, mode=mode)
+        segments, descriptor = raid_manager.encode_object(path)
+        shards = list(segments) + list(raid_manager.encode(segments, descriptor))
+        stored.append([store.write_shard(os.path.join(storage_path, f"worker-{i}", f"{name}.{i}"), shard)
+                       for i, shard in enumerate(shards)])
+
+    def rebuild(failed):
+        for paths in stored:
+            available = [None if i == failed else store.open_shard(p) for i, p in enumerate(paths)]
+            rebuilt = coder.reconstruct(available)
+            store.write_shard(paths[failed] + '.rebuilt', rebuilt[failed])
+
+    rebuilt_bytes = sum(os.path.getsize(paths[0]) for paths in stored)
+    return {
+        'rebuild_data_shard': rebuilt_bytes / best_time(lambda: rebuild(0), repeat) / 1e6,
+        'rebuild_parity_shard': rebuilt_bytes / best_time(lambda: rebuild(coder.total_shards - 1), repeat) / 1e6,
+    }
+
+
+def run_suite(quick=False, repeat=3, geometries=((3, 1), (3, 2), (4, 2))):
+    """Run every benchmark; returns {benchmark key: MB/s}"""
+    logger = logging.getLogger(__name__)
+    work_dir = tempfile.mkdtemp(prefix='raid-bench-')
+    try:
+        dataset = make_dataset(os.path.join(work_dir, 'dataset'), quick=quick)
+        results = {}
+        for k, m in geometries:
+            geometry = f"{k}+{m}"
+            for name, (path, mode) in dataset.items():
+                timings = benchmark_object(os.path.join(work_dir, 'shards'), path, mode, k, m, repeat)
+                for case, mb_per_sec in timings.items():
+                    results[f"{geometry}/{name}/{case}"] = mb_per_sec
+            rebuild_path = os.path.join(work_dir, f"rebuild-{geometry}")
+            for case, mb_per_sec in benchmark_rebuild(rebuild_path, dataset, k, m, repeat).items():
+                results[f"{geometry}/all/{case}"] = mb_per_sec
+            logger.info(f"Finished {geometry} stripes")
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def environment():
+    """Run metadata stored next to the results"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except OSError:
+        revision = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': revision or None,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Benchmarks slower than the baseline by more than tolerance"""
+    regressions = {}
+    for key, mb_per_sec in results.items():
+        reference = baseline.get(key)
+        if reference and mb_per_sec < reference * (1 - tolerance):
+            regressions[key] = (reference, mb_per_sec)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAID throughput benchmark suite")
+    parser.add_argument('--quick', action='store_true', help="Smaller dataset for CI")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Allowed slowdown against the baseline (fraction)")
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    parser.add_argument('--save-baseline', action='store_true')
+    options = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger('storage').setLevel(logging.WARNING)
+    logger = logging.getLogger(__name__)
+
+    results = run_suite(quick=options.quick, repeat=options.repeat)
+    for key, mb_per_sec in sorted(results.items()):
+        logger.info(f"{key}: {mb_per_sec:.1f} MB/s")
+
+    os.makedirs(options.results_dir, exist_ok=True)
+    run = {'environment': environment(), 'quick': options.quick, 'results': results}
+    run_path = os.path.join(options.results_dir, f"run_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(run_path, 'w') as f:
+        json.dump(run, f, indent=2, sort_keys=True)
+    logger.info(f"Results written to {run_path}")
+
+    baseline_path = os.path.join(options.results_dir, 'baseline.json')
+    if options.save_baseline:
+        shutil.copyfile(run_path, baseline_path)
+        logger.info(f"Baseline saved to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        logger.warning("No baseline yet; run with --save-baseline to create one")
+        return 0
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, options.tolerance)
+    for key, (reference, mb_per_sec) in sorted(regressions.items()):
+        logger.error(f"Regression in {key}: {reference:.1f} -> {mb_per_sec:.1f} MB/s")
+    if regressions:
+        return 1
+    logger.info(f"No regressions beyond {options.tolerance:.0%} against {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+import copy
+import time
+import logging
+import threading
+import itertools
+from collections import deque
+from kubernetes import client, config, watch
+
+def _parse_selector(selector):
+    """Parse "key=value,key2=value2" label or field selectors"""
+    if not selector:
+        return {}
+    return dict(term.split('=', 1) for term in selector.split(','))
+
+class ClusterBackend:
+    """Cluster operations used by NodeManager and NodeMonitor
+
+    Objects returned by the list methods are kubernetes client models
+    (V1Pod, V1Node), so callers read them the same way for every backend.
+    """
+
+    def list_pods(self, namespace, label_selector=None, field_selector=None):
+        raise NotImplementedError
+
+    def delete_pod(self, name, namespace):
+        raise NotImplementedError
+
+    def list_nodes(self, label_selector=None):
+        raise NotImplementedError
+
+    def patch_node(self, name, body):
+        raise NotImplementedError
+
+    def scale_deployment(self, name, namespace, replicas):
+        raise NotImplementedError
+
+    def list_node_metrics(self):
+        """metrics.k8s.io usage of every node: [{'metadata': {'name'}, 'usage': {'cpu', 'memory'}}]"""
+        raise NotImplementedError
+
+    def list_pod_metrics(self, namespace):
+        """metrics.k8s.io usage of a namespace's pods: [{'metadata', 'containers': [{'usage'}]}]"""
+        raise NotImplementedError
+
+    def watch_nodes(self, label_selector=None, resource_version=None, timeout_seconds=60):
+        """Stream node events as {'type': ADDED|MODIFIED|DELETED, 'object': V1Node}
+
+        Without a resource_version every existing node is sent as ADDED
+        first. Raises ApiException with status 410 if resource_version has
+        expired; the stream ends after timeout_seconds.
+        """
+        raise NotImplementedError
+
+    def watch_pods(self, namespace, label_selector=None, resource_version=None, timeout_seconds=60):
+        """Stream pod events, like watch_nodes"""
+        raise NotImplementedError
+
+class KubernetesBackend(ClusterBackend):
+    """Backend talking to a real cluster through the Kubernetes API"""
+
+    def __init__(self, in_cluster=False):
+        if in_cluster:
+            config.load_incluster_config()
+        else:
+            config.load_kube_config()
+        self.v1 = client.CoreV1Api()
+        self.apps_v1 = client.AppsV1Api()
+        self.custom = client.CustomObjectsApi()
+
+    def list_pods(self, namespace, label_selector=None, field_selector=None):
+        kwargs = {}
+        if label_selector:
+            kwargs['label_selector'] = label_selector
+        if field_selector:
+            kwargs['field_selector'] = field_selector
+        return self.v1.list_namespaced_pod(namespace=namespace, **kwargs).items
+
+    def delete_pod(self, name, namespace):
+        self.v1.delete_namespaced_pod(name=name, namespace=namespace)
+
+    def list_nodes(self, label_selector=None):
+        if label_selector:
+            return self.v1.list_node(label_selector=label_selector).items
+        return self.v1.list_node().items
+
+    def patch_node(self, name, body):
+        self.v1.patch_node(name, body)
+
+    def scale_deployment(self, name, namespace, replicas):
+        self.apps_v1.patch_namespaced_deployment_scale(
+            name=name, namespace=namespace, body={"spec": {"replicas": replicas}})
+
+    def list_node_metrics(self):
+        return self.custom.list_cluster_custom_object("metrics.k8s.io", "v1beta1", "nodes")['items']
+
+    def list_pod_metrics(self, namespace):
+        return self.custom.list_namespaced_custom_object("metrics.k8s.io", "v1beta1", namespace, "pods")['items']
+
+    @staticmethod
+    def _watch_kwargs(label_selector, resource_version, timeout_seconds):
+        kwargs = {'timeout_seconds': timeout_seconds, 'allow_watch_bookmarks': True}
+        if label_selector:
+            kwargs['label_selector'] = label_selector
+        if resource_version:
+            kwargs['resource_version'] = resource_version
+        return kwargs
+
+    def watch_nodes(self, label_selector=None, resource_version=None, timeout_seconds=60):
+        return watch.Watch().stream(
+            self.v1.list_node, **self._watch_kwargs(label_selector, resource_version, timeout_seconds))
+
+    def watch_pods(self, namespace, label_selector=None, resource_version=None, timeout_seconds=60):
+        return watch.Watch().stream(
+            self.v1.list_namespaced_pod, namespace,
+            **self._watch_kwargs(label_selector, resource_version, timeout_seconds))
+
+class FakeClusterBackend(ClusterBackend):
+    """In-memory cluster for hermetic runs and large failure simulations
+
+    Simulates nodes with Ready conditions, deployments whose pods are
+    scheduled onto the least-loaded schedulable Ready node, pod deletion
+    with rescheduling (after reschedule_delay seconds), cordoning via
+    patch_node, and node failure/repair. Hundreds of nodes cost only a
+    few model objects each.
+    """
+
+    def __init__(self, node_count=5, namespace="cloud-storage", worker_replicas=None,
+                 reschedule_delay=0, node_labels=None, event_history=10000):
+        self.namespace = namespace
+        self.reschedule_delay = reschedule_delay
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.RLock()
+        # Watch events as (resource version, kind, type, snapshot); watches
+        # older than the retained history get 410 Gone like the API server
+        self.changed = threading.Condition(self.lock)
+        self.events = deque(maxlen=event_history)
+        self._versions = itertools.count(1)
+        self.resource_version = 0
+        # metrics.k8s.io usage quantities, set with set_node_usage/set_pod_usage
+        self.node_usage = {}
+        self.pod_usage = {}
+        self.nodes = {}
+        self.pods = {}
+        self.deployments = {}
+        self._pod_ids = itertools.count(1)
+        self._ips = itertools.count(1)
+        self._timers = []
+
+        for i in range(node_count):
+            self.add_node(f"worker-node-{i}", labels=node_labels or {'role': 'worker'})
+        self.create_deployment("worker-deployment", namespace,
+                               node_count if worker_replicas is None else worker_replicas,
+                               labels={'role': 'worker'})
+
+    # Simulation controls
+
+    def add_node(self, name, labels=None, cpu="4", memory="16Gi"):
+        with self.lock:
+            self.nodes[name] = client.V1Node(
+                metadata=client.V1ObjectMeta(name=name, labels=dict(labels or {})),
+                spec=client.V1NodeSpec(unschedulable=False),
+                status=client.V1NodeStatus(
+                    capacity={'cpu': cpu, 'memory': memory},
+                    allocatable={'cpu': cpu, 'memory': memory},
+                    conditions=[client.V1NodeCondition(type="Ready", status="True")],
+                ),
+            )
+            self._emit('node', 'ADDED', self.nodes[name])
+            self._reconcile()
+        return self.nodes[name]
+
+    def create_deployment(self, name, namespace, replicas, labels):
+        with self.lock:
+            self.deployments[name] = {'namespace': namespace, 'replicas': replicas, 'labels': dict(labels)}
+            self._reconcile()
+
+    def fail_node(self, name):
+        """Mark a node NotReady; its pods stop running"""
+        with self.lock:
+            self._ready_condition(self.nodes[name]).status = "False"
+            self._emit('node', 'MODIFIED', self.nodes[name])
+            for pod in self.pods.values():
+                if pod.spec.node_name == name:
+                    pod.status.phase = "Unknown"
+                    self._emit('pod', 'MODIFIED', pod)
+
+    def repair_node(self, name):
+        with self.lock:
+            self._ready_condition(self.nodes[name]).status = "True"
+            self._emit('node', 'MODIFIED', self.nodes[name])
+            for pod in self.pods.values():
+                if pod.spec.node_name == name:
+                    pod.status.phase = "Running"
+                    self._emit('pod', 'MODIFIED', pod)
+            self._reconcile()
+
+    def set_node_usage(self, name, cpu, memory):
+        with self.lock:
+            self.node_usage[name] = {'cpu': cpu, 'memory': memory}
+
+    def set_pod_usage(self, name, cpu, memory):
+        with self.lock:
+            self.pod_usage[name] = {'cpu': cpu, 'memory': memory}
+
+    def bookmark(self):
+        """Send a BOOKMARK event to every watch, as the API server does periodically"""
+        with self.lock:
+            self._emit('bookmark', 'BOOKMARK', None)
+
+    def shutdown(self):
+        """Cancel pending reschedules"""
+        for timer in self._timers:
+            timer.cancel()
+
+    # ClusterBackend
+
+    def list_pods(self, namespace, label_selector=None, field_selector=None):
+        labels = _parse_selector(label_selector)
+        fields = _parse_selector(field_selector)
+        with self.lock:
+            return [
+                pod for pod in self.pods.values()
+                if pod.metadata.namespace == namespace
+                and all(pod.metadata.labels.get(key) == value for key, value in labels.items())
+                and fields.get('spec.nodeName', pod.spec.node_name) == pod.spec.node_name
+            ]
+
+    def delete_pod(self, name, namespace):
+        with self.lock:
+            pod = self.pods.get(name)
+            if pod is None or pod.metadata.namespace != namespace:
+                raise client.ApiException(status=404, reason=f"pod {name} not found")
+            del self.pods[name]
+            self._emit('pod', 'DELETED', pod)
+        self._schedule_reconcile()
+
+    def list_nodes(self, label_selector=None):
+        labels = _parse_selector(label_selector)
+        with self.lock:
+            return [node for node in self.nodes.values()
+                    if all(node.metadata.labels.get(key) == value for key, value in labels.items())]
+
+    def patch_node(self, name, body):
+        with self.lock:
+            node = self.nodes.get(name)
+            if node is None:
+                raise client.ApiException(status=404, reason=f"node {name} not found")
+            unschedulable = body.get('spec', {}).get('unschedulable')
+            if unschedulable is not None:
+                node.spec.unschedulable = unschedulable
+            node.metadata.labels.update(body.get('metadata', {}).get('labels', {}))
+            self._emit('node', 'MODIFIED', node)
+            self._reconcile()
+
+    def scale_deployment(self, name, namespace, replicas):
+        with self.lock:
+            self.deployments[name]['replicas'] = replicas
+            self._reconcile()
+
+    def list_node_metrics(self):
+        with self.lock:
+            return [{'metadata': {'name': name}, 'usage': dict(self.node_usage.get(name, {'cpu': '0', 'memory': '0'}))}
+                    for name, node in self.nodes.items() if self._ready_condition(node).status == "True"]
+
+    def list_pod_metrics(self, namespace):
+        with self.lock:
+            return [{'metadata': {'name': name, 'namespace': namespace},
+                     'containers': [{'name': 'worker', 'usage': dict(self.pod_usage.get(name, {'cpu': '0', 'memory': '0'}))}]}
+                    for name, pod in self.pods.items()
+                    if pod.metadata.namespace == namespace and pod.status.phase == 'Running']
+
+    def watch_nodes(self, label_selector=None, resource_version=None, timeout_seconds=60):
+        labels = _parse_selector(label_selector)
+        return self._watch('node', lambda node: self._matches(node, labels),
+                           resource_version, timeout_seconds)
+
+    def watch_pods(self, namespace, label_selector=None, resource_version=None, timeout_seconds=60):
+        labels = _parse_selector(label_selector)
+        return self._watch('pod', lambda pod: pod.metadata.namespace == namespace and self._matches(pod, labels),
+                           resource_version, timeout_seconds)
+
+    # Watches
+
+    @staticmethod
+    def _matches(obj, labels):
+        return all(obj.metadata.labels.get(key) == value for key, value in labels.items())
+
+    def _emit(self, kind, event_type, obj):
+        """Record a change (caller holds the lock) and wake watchers"""
+        self.resource_version = next(self._versions)
+        if obj is not None:
+            obj.metadata.resource_version = str(self.resource_version)
+            obj = copy.deepcopy(obj)
+        self.events.append((self.resource_version, kind, event_type, obj))
+        self.changed.notify_all()
+
+    def _watch(self, kind, matches, resource_version, timeout_seconds):
+        with self.lock:
+            if resource_version is None:
+                objects = self.nodes if kind == 'node' else self.pods
+                initial = [copy.deepcopy(obj) for obj in objects.values() if matches(obj)]
+                version = self.resource_version
+            else:
+                initial = []
+                version = int(resource_version)
+        yield from ({'type': 'ADDED', 'object': obj} for obj in initial)
+
+        deadline = time.monotonic() + timeout_seconds
+        while True:
+            with self.lock:
+                while self.resource_version == version:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self.changed.wait(remaining)
+                # Versions are consecutive, so the next event's position is known
+                start = version + 1 - self.events[0][0]
+                if start < 0:
+                    raise client.ApiException(status=410, reason=f"resourceVersion {version} is too old")
+                pending = list(itertools.islice(self.events, start, None))
+            for event_version, event_kind, event_type, obj in pending:
+                version = event_version
+                if event_kind == 'bookmark':
+                    # Like the client, bookmarks arrive as raw dicts
+                    raw = {'kind': 'Bookmark', 'metadata': {'resourceVersion': str(event_version)}}
+                    yield {'type': 'BOOKMARK', 'object': raw, 'raw_object': raw}
+                elif event_kind == kind and matches(obj):
+                    yield {'type': event_type, 'object': obj}
+
+    # Scheduling
+
+    @staticmethod
+    def _ready_condition(node):
+        return next(c for c in node.status.conditions if c.type == "Ready")
+
+    def _schedulable(self, node):
+        return not node.spec.unschedulable and self._ready_condition(node).status == "True"
+
+    def _schedule_reconcile(self):
+        if self.reschedule_delay:
+            timer = threading.Timer(self.reschedule_delay, self._reconcile)
+            timer.daemon = True
+            self._timers.append(timer)
+            timer.start()
+        else:
+            self._reconcile()
+
+    def _reconcile(self):
+        """Create or remove pods until every deployment has its replica count"""
+        with self.lock:
+            for name, deployment in self.deployments.items():
+                owned = [pod for pod in self.pods.values() if pod.metadata.owner_references[0].name == name]
+                for pod in owned[deployment['replicas']:]:
+                    del self.pods[pod.metadata.name]
+                    self._emit('pod', 'DELETED', pod)
+                for _ in range(deployment['replicas'] - len(owned)):
+                    self._create_pod(name, deployment)
+
+    def _create_pod(self, deployment_name, deployment):
+        load = {name: 0 for name, node in self.nodes.items() if self._schedulable(node)}
+        if not load:
+            return None
+        for pod in self.pods.values():
+            if pod.spec.node_name in load:
+                load[pod.spec.node_name] += 1
+        node_name = min(load, key=lambda name: (load[name], name))
+
+        pod_id = next(self._pod_ids)
+        ip = next(self._ips)
+        pod = client.V1Pod(
+            metadata=client.V1ObjectMeta(
+                name=f"{deployment_name}-{pod_id:05d}",
+                namespace=deployment['namespace'],
+                labels=dict(deployment['labels']),
+                owner_references=[client.V1OwnerReference(
+                    api_version="apps/v1", kind="ReplicaSet", name=deployment_name, uid=deployment_name)],
+            ),
+            spec=client.V1PodSpec(node_name=node_name, containers=[]),
+            status=client.V1PodStatus(phase="Running", pod_ip=f"10.0.{ip // 250}.{ip % 250 + 1}"),
+        )
+        self.pods[pod.metadata.name] = pod
+        self._emit('pod', 'ADDED', pod)
+        return pod
@@ -1,51 +1,204 @@
-import kubernetes
-from kubernetes import client, config
 import time
+import asyncio
 import logging
 import threading
-import queue
-from storage.raid_manager import RAIDManager
+import itertools
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from storage.raid_manager import RAIDManager, StripeDescriptor
+from storage.shard_store import ShardStore, HEADER_SIZE
+from storage.catalog import StripeCatalog
+from storage.placement import PlacementRing
+from storage.erasure import ErasureCoder
+from storage.checksum import shard_checksum, verify_checksum, parse_checksum, updated_checksum
+from scripts.recovery_scheduler import RecoveryScheduler
+from scripts.rebalancer import Rebalancer
+from scripts.scrubber import Scrubber
+from scripts.cluster_backend import KubernetesBackend
+from storage.shard_client import ShardClient, ShardServerError
 import os
 import numpy as np
 
+def fan_out(executor, tasks, quorum, timeout=None):
+    """Run callables concurrently and return once quorum of them succeeded
+
+    Returns (succeeded, pending): futures that completed successfully and
+    futures still running in the background. Raises TimeoutError or
+    RuntimeError if the quorum is not reached.
+    """
+    futures = [executor.submit(task) for task in tasks]
+    deadline = None if timeout is None else time.monotonic() + timeout
+    succeeded, failed, pending = [], [], set(futures)
+    while len(succeeded) < quorum:
+        if len(futures) - len(failed) < quorum:
+            raise RuntimeError(f"{len(failed)} of {len(futures)} writes failed, quorum of {quorum} unreachable") \
+                from failed[0].exception()
+        remaining = None if deadline is None else max(0, deadline - time.monotonic())
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        if not done:
+            raise TimeoutError(f"Only {len(succeeded)} of {quorum} writes acknowledged")
+        for future in done:
+            (failed if future.exception() else succeeded).append(future)
+    return succeeded, pending
+
 class NodeManager:
-    def __init__(self, namespace="cloud-storage"):
-        # Load kubernetes configuration
-        config.load_kube_config()
-        self.v1 = client.CoreV1Api()
-        self.apps_v1 = client.AppsV1Api()
+    def __init__(self, namespace="cloud-storage", max_concurrent_recoveries=2,
+                 recovery_bandwidth=None, reschedule_timeout=120, shard_port=None,
+                 shard_pool_size=4, write_quorum=None, max_concurrent_moves=4,
+                 rebalance_bandwidth=None, verify_checksums=True, scrub_bandwidth=None,
+                 scrub_interval=3600, backend=None, storage_path="/storage",
+                 spare_load_threshold=80):
+        # Cluster access: the Kubernetes API unless another backend is given
+        # (e.g. FakeClusterBackend for hermetic runs)
+        self.backend = backend or KubernetesBackend()
         self.namespace = namespace
         
         # Add storage path
-        self.storage_path = "/storage"
+        self.storage_path = storage_path
         os.makedirs(self.storage_path, exist_ok=True)
         
         # Setup logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         
-        self.recovery_queue = queue.Queue()
         self.recovery_lock = threading.Lock()
-        self.max_concurrent_recoveries = 1
+        self.max_concurrent_recoveries = max_concurrent_recoveries
         self.recovering_nodes = set()
+        self.reschedule_timeout = reschedule_timeout
         
         self.raid_manager = RAIDManager(self.storage_path)
+        self.shard_store = ShardStore(self.storage_path)
+        self.catalog = StripeCatalog(os.path.join(self.storage_path, 'catalog.db'))
+        self.placement = PlacementRing()
+        
+        # Live node load (busiest of CPU/memory %), pushed by NodeMonitor;
+        # rebuilt shards avoid nodes at or above spare_load_threshold
+        self.node_load = {}
+        self.spare_load_threshold = spare_load_threshold
+        
+        # Remote shard access: with a shard_port, shards are read from and
+        # written to each worker's shard server over pooled connections;
+        # without one, /storage/<node> is treated as a local directory
+        self.shard_port = shard_port
+        self.shard_pool_size = shard_pool_size
+        self.shard_clients = {}
+        self.shard_clients_lock = threading.Lock()
+        
+        # Fan-out shard writes: put_object returns after write_quorum
+        # acknowledgements (default k+1) and stragglers finish here
+        self.write_quorum = write_quorum
+        self.write_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='shard-write')
+        self.pending_writes = set()
+        self.pending_writes_lock = threading.Lock()
+        
+        # Degraded reads fetch shards in parallel and repair lost ones in the background
+        self.read_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='shard-read')
+        self.repair_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shard-repair')
+        self.repairing = set()
+        
+        # Read-modify-write updates of the same object are serialized
+        self.object_locks = defaultdict(threading.Lock)
+        
+        # Bounded, prioritized recovery queue (recovery_bandwidth in bytes/sec)
+        self.recovery_scheduler = RecoveryScheduler(
+            self._perform_recovery,
+            priority_fn=self.data_at_risk,
+            max_workers=max_concurrent_recoveries,
+            bandwidth_bytes_per_sec=recovery_bandwidth,
+            registry=self.raid_manager.registry,
+        )
+    
+        # Shard redistribution after scaling (rebalance_bandwidth in bytes/sec)
+        self.rebalancer = Rebalancer(
+            self.catalog, self.placement, self.read_shard, self.write_shard,
+            self.delete_shard, self.shard_path,
+            max_concurrent_moves=max_concurrent_moves,
+            bandwidth_bytes_per_sec=rebalance_bandwidth,
+            registry=self.raid_manager.registry,
+            object_locks=self.object_locks,
+        )
+        
+        # Shards are verified against their catalogued checksums on read;
+        # the scrubber (started with start_scrubber) checks whole stripes
+        self.verify_checksums = verify_checksums
+        self.scrubber = Scrubber(
+            self.catalog, self.read_shard, self.write_shard,
+            bandwidth_bytes_per_sec=scrub_bandwidth,
+            interval=scrub_interval,
+            registry=self.raid_manager.registry,
+            object_locks=self.object_locks,
+        )
     
     def get_worker_pods(self):
         """Get all worker pods"""
-        return self.v1.list_namespaced_pod(
-            namespace=self.namespace,
-            label_selector="role=worker"
-        ).items
+        return self.backend.list_pods(self.namespace, label_selector="role=worker")
+    
+    def refresh_placement(self):
+        """Sync the placement ring with the nodes running workers
+
+        Shards are placed and catalogued by Kubernetes node name, the
+        identity failures and recoveries are reported with. Nodes that
+        are failed or being recovered are left out.
+        """
+        failed = self.recovery_scheduler.active_nodes | self.recovering_nodes
+        self.placement.update(
+            pod.spec.node_name for pod in self.get_worker_pods()
+            if pod.spec.node_name and pod.status.phase == 'Running' and pod.spec.node_name not in failed
+        )
+        return self.placement
+
+    def update_node_load(self, usage):
+        """Record live node usage ({node: (CPU %, memory %)})"""
+        self.node_load = {node: max(percents) for node, percents in usage.items()}
+
+    def _spare_nodes(self, object_id, exclude=()):
+        """Candidate nodes for rebuilt shards of an object, busy nodes last
+
+        The per-object ring order is otherwise kept, so the shards of a
+        failed node still spread across the cluster.
+        """
+        load = self.node_load
+        return sorted(self.placement.ranked(object_id, exclude),
+                      key=lambda node: load.get(node, 0) >= self.spare_load_threshold)
+
+    def rebalance(self):
+        """Move shards onto the current workers; returns (moved, failed)"""
+        self.refresh_placement()
+        return self.rebalancer.run()
+
+    def scale_workers(self, replicas, deployment="worker-deployment", timeout=None):
+        """Resize the worker deployment and rebalance shards once it is running"""
+        try:
+            self.logger.info(f"Scaling {deployment} to {replicas} replicas")
+            self.backend.scale_deployment(deployment, self.namespace, replicas)
+            
+            deadline = time.monotonic() + (timeout or self.reschedule_timeout)
+            while True:
+                pods = [pod for pod in self.get_worker_pods() if pod.status.phase == 'Running']
+                if len(pods) == replicas or time.monotonic() >= deadline:
+                    break
+                time.sleep(1)
+            
+            _, failed = self.rebalance()
+            return failed == 0
+        except Exception as e:
+            self.logger.error(f"Failed to scale workers: {e}")
+            return False
+
+    def start_scrubber(self):
+        """Start background scrubbing of all catalogued stripes"""
+        return self.scrubber.start()
+
+    def update_stripe_geometry(self, parity_shards=None):
+        """Size the RAID stripe (k data + m parity) to the live worker count"""
+        workers = self.get_worker_pods()
+        return self.raid_manager.configure_for_workers(len(workers), parity_shards)
     
     def shutdown_node(self, pod_name, sleep_time=30):
         """Simulate node failure by deleting the pod"""
         try:
             self.logger.info(f"Shutting down node: {pod_name}")
-            self.v1.delete_namespaced_pod(
-                name=pod_name,
-                namespace=self.namespace
-            )
+            self.backend.delete_pod(pod_name, self.namespace)
             time.sleep(sleep_time)  # Wait for specified time
             return True
         except Exception as e:
@@ -94,56 +247,67 @@ class NodeManager:
             self.logger.info(f"Performing recovery for node: {node_name}")
             
             # Get pods on the node
-            pods = self.v1.list_namespaced_pod(
-                namespace=self.namespace,
-                field_selector=f'spec.nodeName={node_name}'
-            ).items
+            pods = self.backend.list_pods(self.namespace, field_selector=f'spec.nodeName={node_name}')
             
             # Evacuate pods from the node
             for pod in pods:
                 if pod.metadata.name:
                     self.logger.info(f"Evacuating pod {pod.metadata.name} from node {node_name}")
-                    self.v1.delete_namespaced_pod(
-                        name=pod.metadata.name,
-                        namespace=self.namespace
-                    )
+                    self.backend.delete_pod(pod.metadata.name, self.namespace)
             
-            # Wait for pods to be rescheduled
-            time.sleep(30)
+            # Wait for pods to be rescheduled, then rebuild the node's shards
+            evacuated = {pod.metadata.name for pod in pods if pod.metadata.name}
+            if not self._wait_for_rescheduled(evacuated):
+                self.logger.warning(f"Pods from node {node_name} not rescheduled within {self.reschedule_timeout}s")
             
-            return True
+            return self.recover_node_data(node_name)
         except Exception as e:
             self.logger.error(f"Error in node recovery: {e}")
             return False
 
-    def recover_node(self, node_name):
-        """Public method to recover a node"""
-        with self.recovery_lock:
-            if len(self.recovering_nodes) >= self.max_concurrent_recoveries:
-                self.logger.warning(f"Max concurrent recoveries reached. Queueing {node_name}")
-                self.recovery_queue.put(node_name)
+    def _wait_for_rescheduled(self, evacuated, poll_interval=1):
+        """Poll until evacuated pods are replaced by running workers"""
+        deadline = time.monotonic() + self.reschedule_timeout
+        while True:
+            pods = self.get_worker_pods()
+            names = {pod.metadata.name for pod in pods}
+            if not names & evacuated and all(pod.status.phase == 'Running' for pod in pods):
+                return True
+            if time.monotonic() >= deadline:
                 return False
-                
-            self.recovering_nodes.add(node_name)
-            
-        try:
-            success = self._perform_recovery(node_name)
-            return success
-        finally:
-            with self.recovery_lock:
-                self.recovering_nodes.remove(node_name)
-                if not self.recovery_queue.empty():
-                    next_node = self.recovery_queue.get()
-                    threading.Thread(target=self.recover_node, args=(next_node,)).start()
+            time.sleep(poll_interval)
+
+    def data_at_risk(self, node_name):
+        """Recovery priority of a node: (stripes at the loss limit, degraded stripes)
+
+        A stripe that has lost as many shards as it has parity shards
+        cannot survive another failure, so nodes holding such stripes are
+        recovered first.
+        """
+        failed = self.recovery_scheduler.active_nodes | self.recovering_nodes | {node_name}
+        critical = degraded = 0
+        for object_id in self.catalog.objects_on_node(node_name):
+            record = self.catalog.get_object(object_id)
+            lost = sum(shard['node'] in failed for shard in self.catalog.shards_for_object(object_id))
+            degraded += 1
+            if record and lost >= record['parity_shards']:
+                critical += 1
+        return critical, degraded
+
+    def recover_node(self, node_name):
+        """Public method to recover a node
+
+        Queues the node with the recovery scheduler and returns a future
+        for the result. A node that is already queued or recovering is not
+        queued again.
+        """
+        return self.recovery_scheduler.submit(node_name)
 
     def simulate_node_failure(self, node_name):
         """Simulate a node failure and trigger recovery"""
         try:
             # Get pod name from node
-            pods = self.v1.list_namespaced_pod(
-                namespace=self.namespace,
-                label_selector=f"role=worker"
-            ).items
+            pods = self.get_worker_pods()
             
             if not pods:
                 raise ValueError("No worker pods found")
@@ -174,7 +338,7 @@ class NodeManager:
                 self.recovering_nodes.add(node_name)
                 
             # Cordon the node in Kubernetes
-            self.v1.patch_node(node_name, {
+            self.backend.patch_node(node_name, {
                 "spec": {
                     "unschedulable": True
                 }
@@ -186,25 +350,58 @@ class NodeManager:
             self.logger.error(f"Failed to restrict node access: {e}")
             return False
 
-    def recover_node_data(self, node_name):
-        """Recover data using appropriate RAID level"""
+    def recover_node_data(self, node_name, prefetch_depth=4):
+        """Recover data using appropriate RAID level
+
+        Objects are rebuilt in a three-stage pipeline: shards for the next
+        prefetch_depth objects are located and read ahead by a thread
+        pool while the current object is decoded, and a writer thread
+        persists the previous result. A rebuild is then bound by the
+        slower of disk and CPU rather than their sum.
+        """
         try:
-            # Get node storage info
+            # Spare nodes for the rebuilt shards come from the live workers
+            self.refresh_placement()
+            
+            # Get node storage info (indexed catalog lookup, no directory walk)
             node_storage = self.get_node_storage(node_name)
+            images = iter(node_storage.get('images', []))
             
-            for image_path in node_storage.get('images', []):
-                # Get available segments from other nodes
-                available_segments = self.get_available_segments(image_path)
-                
-                if len(available_segments) >= 2:  # RAID 5 recovery
-                    parity = self.get_parity(image_path)
-                    recovered = self.raid_manager.recover_raid5(available_segments, parity)
-                else:  # RAID 6 recovery
-                    parities = self.get_parities(image_path)
-                    recovered = self.raid_manager.recover_raid6(available_segments, parities)
+            with ThreadPoolExecutor(max_workers=prefetch_depth, thread_name_prefix='recovery-fetch') as fetcher, \
+                    ThreadPoolExecutor(max_workers=1, thread_name_prefix='recovery-write') as writer:
+                fetches = deque(
+                    (image_path, fetcher.submit(self._fetch_recovery_inputs, node_name, image_path))
+                    for image_path in itertools.islice(images, prefetch_depth)
+                )
+                writes = deque()
+                written = True
+                failed = []
+                while fetches:
+                    image_path, fetch = fetches.popleft()
+                    next_image = next(images, None)
+                    if next_image is not None:
+                        fetches.append(
+                            (next_image, fetcher.submit(self._fetch_recovery_inputs, node_name, next_image)))
                     
-                # Save recovered data
-                self.save_recovered_data(node_name, image_path, recovered)
+                    # One unreadable object must not stop the rest of the node's rebuild
+                    try:
+                        inputs = fetch.result()
+                        recovered = self._decode_recovery_inputs(inputs)
+                    except Exception as e:
+                        self.logger.error(f"Failed to rebuild {image_path} from {node_name}: {e}")
+                        failed.append(image_path)
+                        continue
+                    writes.append(writer.submit(self._write_recovered, node_name, inputs, recovered))
+                    
+                    # Backpressure: don't let decoded shards pile up behind a slow disk
+                    while len(writes) > prefetch_depth:
+                        written &= writes.popleft().result()
+                
+                written &= all(write.result() for write in writes)
+                if failed:
+                    raise RuntimeError(f"Could not rebuild {len(failed)} objects: {failed}")
+                if not written:
+                    raise RuntimeError("Failed to write recovered shards")
                 
             self.logger.info(f"Data recovery completed for node {node_name}")
             return True
@@ -212,17 +409,89 @@ class NodeManager:
             self.logger.error(f"Failed to recover node data: {e}")
             return False 
 
+    def _fetch_recovery_inputs(self, node_name, image_path):
+        """Stage 1: locate and read ahead the surviving shards of an object"""
+        record = self.catalog.get_object(image_path)
+        if record is None:
+            raise KeyError(f"Object {image_path} is not catalogued")
+        k, m = record['data_shards'], record['parity_shards']
+        
+        # Surviving shards from other nodes (memory-mapped); errors reach the caller
+        available_segments = self._read_catalogued(image_path, range(k), node_name)
+        parities = tuple(self._read_catalogued(image_path, range(k, k + m), node_name))
+        for shard in list(available_segments) + list(parities):
+            if shard is not None:
+                self.recovery_scheduler.throttle(shard.nbytes)
+                self.shard_store.prefetch(shard)
+        
+        return {
+            'image_path': image_path,
+            'record': record,
+            'segments': available_segments,
+            'parities': parities,
+            'lost_parities': self.get_lost_parity_indices(image_path, node_name),
+            'targets': self._recovery_targets(os.path.basename(image_path), node_name),
+        }
+
+    def _recovery_targets(self, object_id, node_name):
+        """Live node for each shard of an object that was lost with node_name
+
+        Rebuilt shards move to nodes holding no other shard of the object;
+        without a spare node they are written back in place.
+        """
+        shards = self.catalog.shards_for_object(object_id)
+        failed = self.recovery_scheduler.active_nodes | self.recovering_nodes | {node_name}
+        spare = self._spare_nodes(object_id, exclude={shard['node'] for shard in shards} | failed)
+        return {shard['shard_index']: spare.pop(0) if spare else node_name
+                for shard in shards if shard['node'] == node_name}
+
+    def _decode_recovery_inputs(self, inputs):
+        """Stage 2: rebuild the lost shards of an object"""
+        segments, parities = inputs['segments'], inputs['parities']
+        missing = [i for i, segment in enumerate(segments) if segment is None]
+        parity = parities[0] if parities else None
+        
+        local = self.shard_port is None
+        if local and len(missing) == 1 and parity is not None and not inputs['lost_parities']:  # RAID 5 recovery
+            # XOR straight from the page cache into the output shard
+            index = missing[0]
+            if index in inputs['targets']:
+                output_path = self.shard_path(inputs['targets'][index], os.path.basename(inputs['image_path']), index)
+            else:
+                output_path = self.get_shard_location(inputs['image_path'], index)['path']
+            survivors = [s for s in segments if s is not None]
+            inputs['rebuilt'] = (index, output_path)
+            return self.recover_segment_into(output_path, parity, survivors, commit=False)
+        
+        # RAID 6 / k+m recovery of every shard the node held
+        record = inputs['record']
+        with self.raid_manager.recovery_time.labels(type='recover_stripe').time():
+            coder = ErasureCoder(record['data_shards'], record['parity_shards'])
+            return coder.reconstruct(list(segments) + list(parities))
+
+    def _write_recovered(self, node_name, inputs, recovered):
+        """Stage 3: persist the rebuilt shards"""
+        if isinstance(recovered, np.memmap):
+            index, output_path = inputs['rebuilt']
+            self.shard_store.commit_shard(output_path, recovered)
+            target = inputs['targets'].get(index)
+            if target is not None and target != node_name:
+                self.catalog.move_shard(os.path.basename(inputs['image_path']), index, target, output_path)
+            return True
+        if recovered is None:
+            return False
+        
+        # Save recovered data
+        return self.save_recovered_data(node_name, inputs['image_path'], recovered, inputs['targets'])
+
     def get_node_storage(self, node_name):
         """Get storage information for a node"""
         try:
             # Get node's storage path
             storage_path = os.path.join(self.storage_path, node_name)
             
-            # Get list of images stored on the node
-            images = []
-            if os.path.exists(storage_path):
-                for root, _, files in os.walk(storage_path):
-                    images.extend([os.path.join(root, f) for f in files if f.endswith(('.jpg', '.png'))])
+            # Objects with a shard on the node, from the stripe catalog
+            images = self.catalog.objects_on_node(node_name)
             
             return {
                 'path': storage_path,
@@ -232,65 +501,514 @@ class NodeManager:
             self.logger.error(f"Failed to get node storage info: {e}")
             return None
 
-    def get_available_segments(self, image_path):
-        """Get available image segments from other nodes"""
+    def get_shard_location(self, image_path, shard_index, stripe=0):
+        """Look up where one shard of an object lives
+
+        Falls back to the placement ring for shards that are not
+        catalogued (e.g. a write that has not been acknowledged yet).
+        """
+        object_id = os.path.basename(image_path)
+        for shard in self.catalog.shards_for_object(object_id):
+            if shard['stripe'] == stripe and shard['shard_index'] == shard_index:
+                return shard
+        
+        record = self.catalog.get_object(object_id)
+        if record is None or not self.placement.nodes:
+            return None
+        node = self.placement.node_for(object_id, shard_index, record['data_shards'] + record['parity_shards'])
+        return {
+            'object_id': object_id, 'stripe': stripe, 'shard_index': shard_index, 'node': node,
+            'path': self.shard_path(node, object_id, shard_index),
+            'checksum': None, 'nbytes': None,
+        }
+
+    def get_lost_parity_indices(self, image_path, node_name):
+        """Parity shard indices of an object stored on a failed node"""
+        record = self.catalog.get_object(os.path.basename(image_path))
+        return [shard['shard_index'] for shard in self.catalog.shards_for_object(record['object_id'])
+                if shard['node'] == node_name and shard['shard_index'] >= record['data_shards']]
+
+    def _open_catalogued_shard(self, shard, failed_node=None):
+        """Read a catalogued shard unless it lives on the failed node or is gone"""
+        if shard is None or shard['node'] == failed_node:
+            return None
+        if self.shard_port is None and not os.path.exists(shard['path']):
+            return None
+        try:
+            data = self.read_shard(shard)
+        except (ShardServerError, OSError, asyncio.TimeoutError) as e:
+            # An unreachable worker only costs this shard, not the whole object
+            self.logger.warning(f"Shard {shard['path']} on {shard['node']} unavailable: {e}")
+            return None
+        if self.verify_checksums and not verify_checksum(data, shard.get('checksum')):
+            # Treat a corrupt shard as lost so it is decoded around and rebuilt
+            self.scrubber.checksum_failures.inc()
+            self.logger.error(f"Checksum mismatch in {shard['path']} on {shard['node']}")
+            return None
+        return data
+
+    def get_shard_client(self, node_name):
+        """Pooled client for the shard server of a worker (by node or pod name)"""
+        with self.shard_clients_lock:
+            client = self.shard_clients.get(node_name)
+        if client is not None:
+            return client
+        
+        for pod in self.get_worker_pods():
+            if node_name in (pod.metadata.name, pod.spec.node_name) and pod.status.pod_ip:
+                client = ShardClient(pod.status.pod_ip, self.shard_port, pool_size=self.shard_pool_size)
+                with self.shard_clients_lock:
+                    client = self.shard_clients.setdefault(node_name, client)
+                return client
+        raise ConnectionError(f"No shard server address for worker {node_name}")
+
+    def _drop_shard_client(self, node_name):
+        """Forget a worker's connections (e.g. after it was rescheduled)"""
+        with self.shard_clients_lock:
+            client = self.shard_clients.pop(node_name, None)
+        if client is not None:
+            client.close()
+
+    def _shard_key(self, shard):
+        """Key of a shard on its worker's server: its path under /storage/<node>"""
+        return os.path.relpath(shard['path'], os.path.join(self.storage_path, shard['node']))
+
+    def _with_shard_client(self, node_name, request):
+        """Run a request against a worker, re-resolving its address once on failure"""
+        try:
+            return request(self.get_shard_client(node_name))
+        except OSError:
+            self._drop_shard_client(node_name)
+            return request(self.get_shard_client(node_name))
+
+    def read_shard(self, shard):
+        """Read a catalogued shard (memory-mapped locally, streamed remotely)"""
+        if self.shard_port is None:
+            return self.shard_store.open_shard(shard['path'])
+        key = self._shard_key(shard)
+        data = self._with_shard_client(shard['node'], lambda client: client.get(key))
+        return self.shard_store.unpack_shard(data)
+
+    def write_shard(self, shard, array):
+        """Write a catalogued shard to its node"""
+        if self.shard_port is None:
+            return self.shard_store.write_shard(shard['path'], array)
+        key = self._shard_key(shard)
+        header, payload = self.shard_store.pack_shard(array)
+        self._with_shard_client(shard['node'], lambda client: client.put(key, header, payload))
+        return shard['path']
+
+    def put_object(self, object_path, nodes=None, write_quorum=None, timeout=None):
+        """Encode an object and write its k+m shards to distinct workers concurrently
+
+        Returns the object id once write_quorum shards (default k+1) are
+        stored and catalogued; the remaining writes finish in the
+        background (see wait_for_writes). If the quorum is not reached the
+        catalog entry and every written shard (including stragglers that
+        finish later) are removed, and None is returned.
+        """
+        try:
+            object_id = os.path.basename(object_path)
+            segments, descriptor = self.raid_manager.encode_object(object_path)
+            shards = list(segments) + list(self.raid_manager.encode(segments, descriptor))
+            
+            if nodes is None:
+                nodes = self.refresh_placement().place(object_id, len(shards))
+            nodes = list(dict.fromkeys(nodes))
+            if len(nodes) < len(shards):
+                raise ValueError(f"Need {len(shards)} distinct workers for a "
+                                 f"{descriptor.data_shards}+{descriptor.parity_shards} stripe, have {len(nodes)}")
+            quorum = write_quorum or self.write_quorum or descriptor.data_shards + 1
+            quorum = min(quorum, len(shards))
+            
+            self.catalog.register_object(
+                object_id, descriptor.data_shards, descriptor.parity_shards, mode=descriptor.mode,
+                shape=descriptor.shape, dtype=descriptor.dtype, size=descriptor.size)
+            placed = list(enumerate(nodes[:len(shards)]))
+            aborted = threading.Event()
+            
+            def store(index, node):
+                try:
+                    return self._put_shard(object_id, index, node, shards[index])
+                finally:
+                    # A write that lands after the put was abandoned removes itself
+                    if aborted.is_set():
+                        self._discard_shard(object_id, index, node)
+            
+            tasks = [lambda index=index, node=node: store(index, node) for index, node in placed]
+            try:
+                with self.raid_manager.recovery_time.labels(type='put_quorum').time():
+                    _, pending = fan_out(self.write_pool, tasks, quorum, timeout)
+            except Exception:
+                aborted.set()
+                self.catalog.remove_object(object_id)
+                for index, node in placed:
+                    self._discard_shard(object_id, index, node)
+                raise
+            
+            with self.pending_writes_lock:
+                self.pending_writes |= pending
+            for future in pending:
+                future.add_done_callback(self._write_finished)
+            self.logger.info(f"Stored {object_id}: {quorum} of {len(shards)} shards acknowledged")
+            return object_id
+        except Exception as e:
+            self.logger.error(f"Failed to put object {object_path}: {e}")
+            return None
+
+    def shard_path(self, node_name, object_id, shard_index):
+        """Storage path of a shard on a worker"""
+        return os.path.join(self.storage_path, node_name, f"{object_id}.{shard_index}")
+
+    def _put_shard(self, object_id, shard_index, node_name, array):
+        """Write one shard and record it in the catalog once it is durable"""
+        shard = {'node': node_name, 'path': self.shard_path(node_name, object_id, shard_index)}
+        self.write_shard(shard, array)
+        self.catalog.add_shard(object_id, shard_index, node_name, shard['path'],
+                               checksum=shard_checksum(array), nbytes=array.nbytes)
+        return shard['path']
+
+    def _discard_shard(self, object_id, shard_index, node_name):
+        """Best-effort removal of a shard written by an abandoned put"""
+        try:
+            self.delete_shard({'node': node_name, 'path': self.shard_path(node_name, object_id, shard_index)})
+        except Exception as e:
+            self.logger.warning(f"Could not remove shard {shard_index} of {object_id} from {node_name}: {e}")
+
+    def _write_finished(self, future):
+        with self.pending_writes_lock:
+            self.pending_writes.discard(future)
+        if future.exception() is not None:
+            # The shard stays uncatalogued, so reads treat it as lost
+            self.logger.error(f"Background shard write failed: {future.exception()}")
+
+    def wait_for_writes(self, timeout=None):
+        """Wait for background shard writes; True if none are left"""
+        with self.pending_writes_lock:
+            pending = set(self.pending_writes)
+        _, not_done = wait(pending, timeout=timeout)
+        return not not_done
+
+    def get_object(self, object_id, repair=True):
+        """Read an object, decoding around lost shards in memory
+
+        Only the data shards are read while they are all reachable. If
+        some are lost (failed or recovering node, missing file) the
+        parities are fetched as well and the stripe is decoded on the
+        fly, so the object is served without waiting for a node rebuild.
+        Lost shards are then repaired in the background when repair=True.
+        Returns an Image or bytes in the object's mode, or None.
+        """
+        try:
+            record = self.catalog.get_object(object_id)
+            if record is None:
+                raise KeyError(f"Object {object_id} is not catalogued")
+            k, m = record['data_shards'], record['parity_shards']
+            locations = {shard['shard_index']: shard for shard in self.catalog.shards_for_object(object_id)}
+            failed = self.recovery_scheduler.active_nodes | self.recovering_nodes
+            
+            segments = self._read_shards([locations.get(index) for index in range(k)], failed)
+            parities = [None] * m
+            missing = [index for index, segment in enumerate(segments) if segment is None]
+            if missing:
+                self.logger.warning(f"Degraded read of {object_id}: data shards {missing} unavailable")
+                parities = self._read_shards([locations.get(k + j) for j in range(m)], failed)
+                with self.raid_manager.recovery_time.labels(type='degraded_read').time():
+                    segments = self._decode_degraded(segments, parities, record)
+            
+            descriptor = StripeDescriptor.from_record(record, segments[0].shape)
+            lost = missing + [k + j for j, parity in enumerate(parities) if parity is None and missing]
+            if repair and lost:
+                self.schedule_repair(object_id, lost)
+            return self.raid_manager.reconstruct_object(segments, descriptor)
+        except Exception as e:
+            self.logger.error(f"Failed to read object {object_id}: {e}")
+            return None
+
+    def _read_shards(self, shards, failed_nodes):
+        """Fetch catalogued shards in parallel; None where a shard is unavailable"""
+        def read(shard):
+            if shard is None or shard['node'] in failed_nodes:
+                return None
+            try:
+                return self._open_catalogued_shard(shard)
+            except Exception as e:
+                self.logger.warning(f"Shard {shard['path']} on {shard['node']} unavailable: {e}")
+                return None
+        return list(self.read_pool.map(read, shards))
+
+    def _decode_degraded(self, segments, parities, record):
+        """Recover the lost data segments of a stripe from the survivors"""
+        if record['parity_shards'] == 1:
+            return self.raid_manager.recover_raid5(segments, parities[0])
+        if record['parity_shards'] == 2:
+            return self.raid_manager.recover_raid6(segments, parities)
+        coder = ErasureCoder(record['data_shards'], record['parity_shards'])
+        return coder.decode(list(segments) + list(parities))
+
+    def schedule_repair(self, object_id, lost_indices):
+        """Rewrite the lost shards of an object in the background"""
+        with self.pending_writes_lock:
+            if object_id in self.repairing:
+                return None
+            self.repairing.add(object_id)
+        future = self.repair_pool.submit(self.repair_object, object_id, lost_indices)
+        future.add_done_callback(lambda _: self._repair_finished(object_id))
+        return future
+
+    def _repair_finished(self, object_id):
+        with self.pending_writes_lock:
+            self.repairing.discard(object_id)
+
+    def repair_object(self, object_id, lost_indices):
+        """Write rebuilt shards back to healthy workers
+
+        The surviving shards are re-read under the object's lock, so a
+        concurrent update is never overwritten with shards rebuilt from
+        older data. A shard whose node is failed (or which was never
+        catalogued) is placed on a live worker that holds no other shard
+        of the object.
+        """
+        try:
+            with self.object_locks[object_id]:
+                return self._repair_locked(object_id, lost_indices)
+        except Exception as e:
+            self.logger.error(f"Failed to repair object {object_id}: {e}")
+            return False
+
+    def _repair_locked(self, object_id, lost_indices):
+        record = self.catalog.get_object(object_id)
+        if record is None:
+            self.logger.info(f"{object_id} was removed before it could be repaired")
+            return False
+        k, m = record['data_shards'], record['parity_shards']
+        locations = {shard['shard_index']: shard for shard in self.catalog.shards_for_object(object_id)}
+        failed = self.recovery_scheduler.active_nodes | self.recovering_nodes
+        
+        survivors = self._read_shards(
+            [None if index in lost_indices else locations.get(index) for index in range(k + m)], failed)
+        lost_indices = [index for index, shard in enumerate(survivors) if shard is None]
+        segments, parities = survivors[:k], survivors[k:]
+        if any(segment is None for segment in segments):
+            segments = self._decode_degraded(segments, parities, record)
+        descriptor = StripeDescriptor.from_record(record, segments[0].shape)
+        shards = list(segments) + list(self.raid_manager.encode(segments, descriptor))
+        
+        used = {shard['node'] for shard in locations.values() if shard['node'] not in failed}
+        self.refresh_placement()
+        spare = self._spare_nodes(object_id, exclude=used | failed)
+        
+        for index in lost_indices:
+            shard = locations.get(index)
+            if shard is not None and shard['node'] not in failed:
+                self.write_shard(shard, shards[index])
+                continue
+            if not spare:
+                self.logger.warning(f"No spare worker to repair shard {index} of {object_id}")
+                return False
+            node = spare.pop(0)
+            self._put_shard(object_id, index, node, shards[index])
+            self.logger.info(f"Moved shard {index} of {object_id} to {node}")
+        
+        self.logger.info(f"Repaired shards {lost_indices} of {object_id}")
+        return True
+
+    def read_shard_range(self, shard, offset, length):
+        """Read a byte range of a shard's payload"""
+        if self.shard_port is None:
+            return self.shard_store.read_range(shard['path'], offset, length)
+        key = self._shard_key(shard)
+        return self._with_shard_client(
+            shard['node'], lambda client: client.range_get(key, HEADER_SIZE + offset, length))
+
+    def write_shard_range(self, shard, offset, data):
+        """Overwrite a byte range of a shard's payload in place"""
+        if self.shard_port is None:
+            return self.shard_store.write_range(shard['path'], offset, data)
+        key = self._shard_key(shard)
+        self._with_shard_client(shard['node'], lambda client: client.patch(key, HEADER_SIZE + offset, data))
+
+    def update_object(self, object_id, offset, data):
+        """Overwrite bytes of a stored object with a parity delta update
+
+        offset is in the object's flat byte layout (pixel bytes in image
+        mode). Only the touched ranges of the affected data shards and
+        of each parity shard are read and written:
+        new parity = old parity ^ c * (old data ^ new data).
+        """
         try:
-            segments = []
-            image_name = os.path.basename(image_path)
+            record = self.catalog.get_object(object_id)
+            if record is None:
+                raise KeyError(f"Object {object_id} is not catalogued")
+            k, m = record['data_shards'], record['parity_shards']
+            data = np.frombuffer(memoryview(data).cast('B'), dtype=np.uint8)
+            size = record['size'] or 0
+            if offset < 0 or offset + data.size > size:
+                raise ValueError(f"Range {offset}+{data.size} is outside object of {size} bytes")
+            
+            locations = {shard['shard_index']: shard for shard in self.catalog.shards_for_object(object_id)}
+            missing = [index for index in range(k + m) if index not in locations]
+            if missing:
+                raise RuntimeError(f"Shards {missing} of {object_id} are not available for update")
+            segment_bytes = locations[0]['nbytes'] or self._segment_bytes(record)
             
-            # Check each node for segments
-            for node in self.get_worker_pods():
-                node_storage = self.get_node_storage(node.metadata.name)
-                if node_storage:
-                    segment_path = os.path.join(node_storage['path'], f"segment_{image_name}")
-                    if os.path.exists(segment_path):
-                        segments.append(np.load(segment_path))
+            with self.object_locks[object_id]:
+                position = offset
+                while position < offset + data.size:
+                    index, start = divmod(position, segment_bytes)
+                    length = min(segment_bytes - start, offset + data.size - position)
+                    new = data[position - offset:position - offset + length]
+                    self._update_segment_range(record, locations, index, start, new, segment_bytes)
+                    position += length
             
-            return segments
+            self.logger.info(f"Updated {data.size} bytes of {object_id} at offset {offset}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to update object {object_id}: {e}")
+            return False
+
+    @staticmethod
+    def _segment_bytes(record):
+        """Payload size of one data shard, from the object's original layout"""
+        k, size, shape = record['data_shards'], record['size'], record['shape']
+        if record['mode'] == 'image' and shape:
+            return -(-shape[0] // k) * (size // shape[0])
+        return max(1, -(-size // k))
+
+    def _update_segment_range(self, record, locations, index, start, new, segment_bytes):
+        """Rewrite one data shard range and the matching range of every parity
+
+        Reads are widened to whole checksum blocks so the shards' block
+        checksums can be refreshed without reading anything else.
+        """
+        k, m = record['data_shards'], record['parity_shards']
+        shards = [locations[index]] + [locations[k + j] for j in range(m)]
+        block_size = max((parse_checksum(shard['checksum'])[1] for shard in shards if shard['checksum']),
+                         default=1)
+        block_start = start // block_size * block_size
+        block_stop = min(-(-(start + new.size) // block_size) * block_size, segment_bytes)
+        window = slice(start - block_start, start - block_start + new.size)
+        
+        reads = [self.read_pool.submit(self.read_shard_range, shard, block_start, block_stop - block_start)
+                 for shard in shards]
+        blocks = [np.frombuffer(read.result(), dtype=np.uint8).copy() for read in reads]
+        if any(block.size != block_stop - block_start for block in blocks):
+            raise IOError(f"Short read updating shard {index} at offset {start}")
+        
+        old = blocks[0][window].copy()
+        blocks[0][window] = new
+        ErasureCoder(k, m).update([block[window] for block in blocks[1:]], index, old, new)
+        writes = [self.write_pool.submit(self.write_shard_range, shard, start, block[window])
+                  for shard, block in zip(shards, blocks)]
+        for write in writes:
+            write.result()
+        
+        for shard, block in zip(shards, blocks):
+            if shard['checksum']:
+                shard['checksum'] = updated_checksum(shard['checksum'], block_start, block)
+                self.catalog.update_checksum(shard['object_id'], shard['shard_index'], shard['checksum'],
+                                             stripe=shard['stripe'])
+
+    def delete_shard(self, shard):
+        """Remove a shard from its node"""
+        if self.shard_port is None:
+            if os.path.exists(shard['path']):
+                os.remove(shard['path'])
+            return
+        key = self._shard_key(shard)
+        self._with_shard_client(shard['node'], lambda client: client.delete(key))
+
+    def _read_catalogued(self, image_path, indices, failed_node=None):
+        """Read shards of an object by index, None where lost; lookup errors propagate"""
+        return [self._open_catalogued_shard(self.get_shard_location(image_path, index), failed_node)
+                for index in indices]
+
+    def get_available_segments(self, image_path, failed_node=None):
+        """Get available image segments from other nodes
+
+        Returns one entry per data segment, with None for lost segments.
+        """
+        try:
+            record = self.catalog.get_object(os.path.basename(image_path))
+            if record is None:
+                return []
+            
+            return self._read_catalogued(image_path, range(record['data_shards']), failed_node)
         except Exception as e:
             self.logger.error(f"Failed to get available segments: {e}")
             return []
 
-    def get_parity(self, image_path):
+    def get_parity(self, image_path, failed_node=None):
         """Get RAID 5 parity for an image"""
         try:
-            image_name = os.path.basename(image_path)
-            parity_path = os.path.join(self.storage_path, 'parity', f"parity5_{image_name}.npy")
-            if os.path.exists(parity_path):
-                return np.load(parity_path)
-            return None
+            record = self.catalog.get_object(os.path.basename(image_path))
+            if record is None or record['parity_shards'] < 1:
+                return None
+            shard = self.get_shard_location(image_path, record['data_shards'])
+            return self._open_catalogued_shard(shard, failed_node)
         except Exception as e:
             self.logger.error(f"Failed to get parity: {e}")
             return None
 
-    def get_parities(self, image_path):
-        """Get RAID 6 parities for an image"""
+    def get_parities(self, image_path, failed_node=None):
+        """Get all parity shards (P, Q, ...) for an image, None where lost"""
         try:
-            image_name = os.path.basename(image_path)
-            parity_path = os.path.join(self.storage_path, 'parity')
-            p1_path = os.path.join(parity_path, f"parity6_p_{image_name}.npy")
-            p2_path = os.path.join(parity_path, f"parity6_q_{image_name}.npy")
+            record = self.catalog.get_object(os.path.basename(image_path))
+            if record is None:
+                return None, None
             
-            if os.path.exists(p1_path) and os.path.exists(p2_path):
-                return np.load(p1_path), np.load(p2_path)
-            return None, None
+            k = record['data_shards']
+            return tuple(self._read_catalogued(image_path, range(k, k + record['parity_shards']), failed_node))
         except Exception as e:
             self.logger.error(f"Failed to get parities: {e}")
             return None, None
 
-    def save_recovered_data(self, node_name, image_path, recovered_data):
-        """Save recovered data back to node"""
+    def save_recovered_data(self, node_name, image_path, recovered_data, targets=None):
+        """Save the recovered shards that belonged to a node
+
+        targets maps shard index to the node a shard moves to (and is
+        re-catalogued on); other shards are written back to node_name.
+        """
         try:
-            # Create node storage directory
-            node_path = os.path.join(self.storage_path, node_name)
-            os.makedirs(node_path, exist_ok=True)
-            
-            # Save recovered data
-            output_path = os.path.join(node_path, os.path.basename(image_path))
-            np.save(output_path, recovered_data)
-            
-            self.logger.info(f"Saved recovered data to {output_path}")
+            object_id = os.path.basename(image_path)
+            for shard in self.catalog.shards_for_object(object_id):
+                if shard['node'] != node_name:
+                    continue
+                index = shard['shard_index']
+                target = (targets or {}).get(index, node_name)
+                if target != node_name:
+                    shard = dict(shard, node=target, path=self.shard_path(target, object_id, index))
+                
+                # Save recovered data
+                output_path = self.write_shard(shard, recovered_data[index])
+                if target != node_name:
+                    self.catalog.move_shard(object_id, index, target, shard['path'], stripe=shard['stripe'])
+                self.logger.info(f"Saved recovered data to {output_path}")
             return True
         except Exception as e:
             self.logger.error(f"Failed to save recovered data: {e}")
-            return False 
\ No newline at end of file
+            return False
+
+    def recover_segment_into(self, output_path, parity, available_segments, commit=True):
+        """Rebuild a lost RAID 5 segment directly into a memory-mapped shard
+
+        Returns the output memmap, or None. It is renamed to output_path
+        unless commit=False, in which case the caller commits it with
+        shard_store.commit_shard.
+        """
+        out = None
+        try:
+            out = self.shard_store.create_shard(output_path, parity.shape, parity.dtype)
+            with self.raid_manager.recovery_time.labels(type='recover_raid5_mmap').time():
+                self.shard_store.xor_into(out, [parity] + list(available_segments))
+            if commit:
+                self.shard_store.commit_shard(output_path, out)
+            self.raid_manager.recovery_count.labels(type='raid5', success='true').inc()
+            
+            self.logger.info(f"Recovered segment into {output_path}")
+            return out
+        except Exception as e:
+            self.logger.error(f"Failed to recover segment: {e}")
+            if out is not None:
+                self.shard_store.discard_shard(out)
+            return None
@@ -1,80 +1,145 @@
 #!/usr/bin/env python3
+import sys
 import logging
 import time
-from kubernetes import client, config
-from prometheus_client import start_http_server, Gauge
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from prometheus_client import start_http_server, Gauge, CollectorRegistry
+from scripts.cluster_backend import KubernetesBackend
+
+# Kubernetes quantity suffixes (decimal SI and binary)
+QUANTITY_SUFFIXES = {
+    'n': 1e-9, 'u': 1e-6, 'm': 1e-3, '': 1,
+    'k': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'P': 1e15, 'E': 1e18,
+    'Ki': 2**10, 'Mi': 2**20, 'Gi': 2**30, 'Ti': 2**40, 'Pi': 2**50, 'Ei': 2**60,
+}
+
+@lru_cache(maxsize=4096)
+def parse_quantity(quantity):
+    """Parse a Kubernetes quantity ("250m", "1.5Gi", "12345678n", "1e3") to a float
+
+    Cached, since a cluster reports few distinct capacities and sweeps
+    repeat the same values.
+    """
+    quantity = str(quantity).strip()
+    number = quantity.rstrip('numkKMGTPEi')
+    suffix = quantity[len(number):]
+    if suffix not in QUANTITY_SUFFIXES:
+        raise ValueError(f"Invalid quantity: {quantity}")
+    return float(number) * QUANTITY_SUFFIXES[suffix]
 
 class NodeMonitor:
-    def __init__(self):
+    def __init__(self, backend=None, namespace='cloud-storage', metrics_port=8000, registry=None,
+                 manager=None):
         self.logger = logging.getLogger(__name__)
-        config.load_kube_config()
-        self.v1 = client.CoreV1Api()
-        self.custom = client.CustomObjectsApi()
+        # Cluster access: the Kubernetes API unless another backend is given
+        self.backend = backend or KubernetesBackend()
+        self.namespace = namespace
+        
+        # Recoveries are handed to one long-lived NodeManager (created on
+        # first use unless given), so its clients, pools and recovery queue
+        # are shared; recoveries maps node -> future of its current recovery
+        self._manager = manager
+        self._manager_lock = threading.Lock()
+        self.recoveries = {}
+        self.recoveries_lock = threading.Lock()
+        
+        # Prometheus metrics with custom registry
+        self.registry = registry or CollectorRegistry()
+        self.node_cpu_usage = Gauge('node_cpu_usage', 'CPU usage by node', ['node'], registry=self.registry)
+        self.node_memory_usage = Gauge('node_memory_usage', 'Memory usage by node', ['node'], registry=self.registry)
+        self.node_status = Gauge('node_status', 'Node status (1=healthy, 0=unhealthy)', ['node'], registry=self.registry)
+        self.pod_status = Gauge('pod_status', 'Pod status (1=running, 0=failed)', ['pod'], registry=self.registry)
+        self.pod_restarts = Gauge('pod_restarts', 'Pod restart count', ['pod'], registry=self.registry)
+        self.pod_cpu_usage = Gauge('pod_cpu_usage', 'CPU usage by pod (cores)', ['pod'], registry=self.registry)
+        self.pod_memory_usage = Gauge('pod_memory_usage', 'Memory usage by pod (bytes)', ['pod'], registry=self.registry)
         
-        # Prometheus metrics
-        self.node_cpu_usage = Gauge('node_cpu_usage', 'CPU usage by node', ['node'])
-        self.node_memory_usage = Gauge('node_memory_usage', 'Memory usage by node', ['node'])
-        self.node_status = Gauge('node_status', 'Node status (1=healthy, 0=unhealthy)', ['node'])
-        self.pod_status = Gauge('pod_status', 'Pod status (1=running, 0=failed)', ['pod'])
-        self.pod_restarts = Gauge('pod_restarts', 'Pod restart count', ['pod'])
+        # Latest live usage per node from collect_usage: {node: (CPU %, memory %)}
+        self.node_usage = {}
         
-        # Start Prometheus metrics server
-        start_http_server(8000)
+        # Watch mode: last seen Ready status and phase per object, so only
+        # transitions trigger recovery (handed off so watches never block)
+        self.node_ready = {}
+        self.pod_phases = {}
+        self.recovery_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='monitor-recovery')
+        self._stop = threading.Event()
+        self._watchers = []
+        
+        # Start Prometheus metrics server (metrics_port=None to skip)
+        if metrics_port is not None:
+            start_http_server(metrics_port, registry=self.registry)
         
     def get_node_metrics(self, node_name):
+        """Live (CPU %, memory %) of one node; prefer collect_usage for sweeps"""
         try:
-            # Get node metrics using metrics API
-            metrics = self.v1.list_node().items
-            for node in metrics:
-                if node.metadata.name == node_name:
-                    cpu_percent = self._get_cpu_percent(node)
-                    memory_percent = self._get_memory_percent(node)
-                    
-                    # Update Prometheus metrics
-                    self.node_cpu_usage.labels(node=node_name).set(cpu_percent)
-                    self.node_memory_usage.labels(node=node_name).set(memory_percent)
-                    
-                    return cpu_percent, memory_percent
-            return None, None
+            return self.collect_usage().get(node_name, (None, None))
         except Exception as e:
             self.logger.error(f"Failed to get metrics for node {node_name}: {e}")
             return None, None
             
-    def _get_cpu_percent(self, node):
+    def collect_usage(self, nodes=None):
+        """Publish live CPU and memory usage of every node and pod
+        
+        Usage comes from metrics.k8s.io with one list call for nodes and
+        one for pods; node percentages are relative to allocatable
+        resources (as kubectl top reports them). nodes is an optional
+        node listing to reuse. Returns {node: (CPU %, memory %)}, also
+        kept in self.node_usage and passed to the node manager for
+        spare-node selection.
+        """
         try:
-            allocatable = node.status.allocatable.get('cpu', '0')
-            capacity = node.status.capacity.get('cpu', '0')
-            if allocatable and capacity:
-                return (float(capacity) - float(allocatable)) / float(capacity) * 100
-            return 0
-        except:
-            return 0
+            if nodes is None:
+                nodes = self.backend.list_nodes(label_selector='role=worker')
+            allocatable = {node.metadata.name: node.status.allocatable or {} for node in nodes}
             
-    def _get_memory_percent(self, node):
+            usage = {}
+            for item in self.backend.list_node_metrics():
+                node_name = item['metadata']['name']
+                if node_name not in allocatable:
+                    continue
+                cpu_percent = self._percent(item['usage'].get('cpu'), allocatable[node_name].get('cpu'))
+                memory_percent = self._percent(item['usage'].get('memory'), allocatable[node_name].get('memory'))
+                self.node_cpu_usage.labels(node=node_name).set(cpu_percent)
+                self.node_memory_usage.labels(node=node_name).set(memory_percent)
+                usage[node_name] = (cpu_percent, memory_percent)
+                
+            for item in self.backend.list_pod_metrics(self.namespace):
+                containers = item.get('containers', [])
+                pod_name = item['metadata']['name']
+                self.pod_cpu_usage.labels(pod=pod_name).set(
+                    sum(parse_quantity(c['usage'].get('cpu', '0')) for c in containers))
+                self.pod_memory_usage.labels(pod=pod_name).set(
+                    sum(parse_quantity(c['usage'].get('memory', '0')) for c in containers))
+        except Exception as e:
+            self.logger.warning(f"Resource metrics unavailable (is metrics-server running?): {e}")
+            return {}
+            
+        self.node_usage = usage
         try:
-            allocatable = self._convert_to_bytes(node.status.allocatable.get('memory', '0Ki'))
-            capacity = self._convert_to_bytes(node.status.capacity.get('memory', '0Ki'))
-            if allocatable and capacity:
-                return (capacity - allocatable) / capacity * 100
-            return 0
-        except:
-            return 0
+            self.manager.update_node_load(usage)
+        except Exception as e:
+            self.logger.error(f"Failed to pass node load to the node manager: {e}")
+        return usage
             
-    def _convert_to_bytes(self, memory_str):
-        units = {'Ki': 1024, 'Mi': 1024**2, 'Gi': 1024**3, 'Ti': 1024**4}
-        number = float(''.join([c for c in memory_str if c.isdigit() or c == '.']))
-        unit = ''.join([c for c in memory_str if c.isalpha()])
-        return number * units.get(unit, 1)
+    @staticmethod
+    def _percent(used, available):
+        if not used or not available:
+            return 0
+        available = parse_quantity(available)
+        return parse_quantity(used) / available * 100 if available else 0
             
     def check_node_health(self):
+        """One sweep over the worker nodes, computed from a single list call"""
         try:
-            nodes = self.v1.list_node(label_selector='role=worker')
+            nodes = self.backend.list_nodes(label_selector='role=worker')
+            usage = self.collect_usage(nodes)
             unhealthy_nodes = []
             
-            for node in nodes.items:
+            for node in nodes:
                 node_name = node.metadata.name
                 node_status = "Ready"
-                cpu_usage, memory_usage = self.get_node_metrics(node_name)
+                cpu_usage, memory_usage = usage.get(node_name, (None, None))
                 
                 for condition in node.status.conditions:
                     if condition.type == "Ready":
@@ -84,9 +149,11 @@ class NodeMonitor:
                             self.node_status.labels(node=node_name).set(0)
                         else:
                             self.node_status.labels(node=node_name).set(1)
+                            self._recovered(node_name)
                             
-                self.logger.info(f"Node {node_name} status: {node_status}, CPU: {cpu_usage}%, Memory: {memory_usage}%")
+                self.logger.debug(f"Node {node_name} status: {node_status}, CPU: {cpu_usage}%, Memory: {memory_usage}%")
                 
+            self.logger.info(f"Checked {len(nodes)} nodes, {len(unhealthy_nodes)} unhealthy")
             return unhealthy_nodes
         except Exception as e:
             self.logger.error(f"Error checking node health: {e}")
@@ -94,10 +161,10 @@ class NodeMonitor:
             
     def check_pod_health(self):
         try:
-            pods = self.v1.list_namespaced_pod(namespace='cloud-storage')
+            pods = self.backend.list_pods(self.namespace)
             unhealthy_pods = []
             
-            for pod in pods.items:
+            for pod in pods:
                 pod_name = pod.metadata.name
                 pod_status = pod.status.phase
                 restart_count = pod.status.container_statuses[0].restart_count if pod.status.container_statuses else 0
@@ -134,22 +201,159 @@ class NodeMonitor:
                 self.logger.error(f"Error in monitoring loop: {e}")
             time.sleep(interval)
             
+    @staticmethod
+    def _is_ready(node):
+        return any(condition.type == "Ready" and condition.status == "True"
+                   for condition in node.status.conditions or [])
+            
+    def _on_node_event(self, event_type, node):
+        node_name = node.metadata.name
+        if event_type == 'DELETED':
+            self.node_ready.pop(node_name, None)
+            return
+        ready = self._is_ready(node)
+        was_ready = self.node_ready.get(node_name)
+        self.node_ready[node_name] = ready
+        self.node_status.labels(node=node_name).set(1 if ready else 0)
+        
+        if not ready and was_ready is not False:
+            self.logger.warning(f"Node {node_name} is NotReady")
+            self.recovery_pool.submit(self.trigger_recovery, [node_name])
+        elif ready and was_ready is False:
+            self.logger.info(f"Node {node_name} is Ready again")
+            self._recovered(node_name)
+            
+    def _on_pod_event(self, event_type, pod):
+        pod_name = pod.metadata.name
+        if event_type == 'DELETED':
+            self.pod_phases.pop(pod_name, None)
+            return
+        pod_status = pod.status.phase
+        restart_count = pod.status.container_statuses[0].restart_count if pod.status.container_statuses else 0
+        previous = self.pod_phases.get(pod_name)
+        self.pod_phases[pod_name] = pod_status
+        self.pod_status.labels(pod=pod_name).set(1 if pod_status == 'Running' else 0)
+        self.pod_restarts.labels(pod=pod_name).set(restart_count)
+        
+        # Pending pods are still starting; only failures need recovery
+        if pod_status in ('Failed', 'Unknown') and previous != pod_status:
+            self.logger.warning(f"Pod {pod_name} is {pod_status}")
+            self.recovery_pool.submit(self.trigger_pod_recovery, [pod_name])
+            
+    def _watch(self, kind, stream, handler, retry_interval=5):
+        """Apply watch events until stopped, resuming from the last resourceVersion"""
+        resource_version = None
+        while not self._stop.is_set():
+            try:
+                for event in stream(resource_version):
+                    if event['type'] == 'BOOKMARK':
+                        # Bookmarks only carry a resourceVersion, as a plain dict
+                        resource_version = event['raw_object']['metadata']['resourceVersion']
+                    else:
+                        resource_version = event['object'].metadata.resource_version
+                        handler(event['type'], event['object'])
+                    if self._stop.is_set():
+                        return
+            except Exception as e:
+                if getattr(e, 'status', None) == 410:
+                    # History compacted past our version: relist and carry on
+                    self.logger.info(f"{kind} watch expired at resourceVersion {resource_version}, relisting")
+                    resource_version = None
+                    continue
+                self.logger.error(f"Error watching {kind}s: {e}")
+                self._stop.wait(retry_interval)
+            
+    def _sweep_usage(self, interval):
+        """Collect live usage every interval seconds until stopped"""
+        while not self._stop.is_set():
+            self.collect_usage()
+            self._stop.wait(interval)
+            
+    def start_watching(self, watch_timeout=60, usage_interval=30):
+        """Event-driven monitoring: watch nodes and pods in daemon threads
+        
+        Watches reconnect every watch_timeout seconds from the last seen
+        resourceVersion, so no state is re-downloaded unless it expired.
+        Usage (which metrics.k8s.io cannot watch) is swept every
+        usage_interval seconds.
+        """
+        self._stop.clear()
+        streams = {
+            'node': (lambda version: self.backend.watch_nodes(
+                label_selector='role=worker', resource_version=version, timeout_seconds=watch_timeout),
+                self._on_node_event),
+            'pod': (lambda version: self.backend.watch_pods(
+                self.namespace, resource_version=version, timeout_seconds=watch_timeout),
+                self._on_pod_event),
+        }
+        for kind, (stream, handler) in streams.items():
+            watcher = threading.Thread(target=self._watch, args=(kind, stream, handler),
+                                       name=f'{kind}-watch', daemon=True)
+            watcher.start()
+            self._watchers.append(watcher)
+        sweeper = threading.Thread(target=self._sweep_usage, args=(usage_interval,),
+                                   name='usage-sweep', daemon=True)
+        sweeper.start()
+        self._watchers.append(sweeper)
+        return self
+        
+    def stop_watching(self):
+        self._stop.set()
+        for watcher in self._watchers:
+            watcher.join()
+        self._watchers = []
+        
+    def watch_system(self, watch_timeout=60, usage_interval=30):
+        """Blocking watch-based alternative to monitor_system"""
+        self.start_watching(watch_timeout, usage_interval)
+        for watcher in list(self._watchers):
+            watcher.join()
+            
+    @property
+    def manager(self):
+        """The shared NodeManager that recoveries are handed to"""
+        with self._manager_lock:
+            if self._manager is None:
+                from scripts.node_manager import NodeManager
+                self._manager = NodeManager(namespace=self.namespace, backend=self.backend)
+            return self._manager
+            
+    @staticmethod
+    def _recovery_pending(future):
+        """True while a recovery is queued or running, or after it succeeded"""
+        if future is None:
+            return False
+        if not future.done():
+            return True
+        return future.exception() is None and bool(future.result())
+            
+    def _recovered(self, node_name):
+        """Forget a node's recovery once it is Ready, so a new failure is handled"""
+        with self.recoveries_lock:
+            self.recoveries.pop(node_name, None)
+            
     def trigger_recovery(self, unhealthy_nodes):
-        """Trigger automated recovery for unhealthy nodes"""
+        """Trigger automated recovery for unhealthy nodes
+        
+        Each failure is handed over once: a node whose recovery is queued,
+        running or has succeeded is skipped until it is Ready again, and a
+        failed recovery is retried on the next trigger.
+        """
         try:
-            from scripts.node_manager import NodeManager
-            manager = NodeManager()
+            manager = self.manager
             
             for node in unhealthy_nodes:
-                self.logger.info(f"Initiating recovery for node: {node}")
-                manager.recover_node(node)
+                with self.recoveries_lock:
+                    if self._recovery_pending(self.recoveries.get(node)):
+                        continue
+                    self.logger.info(f"Initiating recovery for node: {node}")
+                    self.recoveries[node] = manager.recover_node(node)
         except Exception as e:
             self.logger.error(f"Error triggering recovery: {e}")
             
     def trigger_pod_recovery(self, unhealthy_pods):
         try:
-            from scripts.node_manager import NodeManager
-            manager = NodeManager()
+            manager = self.manager
             
             for pod in unhealthy_pods:
                 if 'worker-deployment' in pod:
@@ -161,4 +365,7 @@ class NodeMonitor:
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     monitor = NodeMonitor()
-    monitor.monitor_system() 
\ No newline at end of file
+    if '--poll' in sys.argv:
+        monitor.monitor_system()
+    else:
+        monitor.watch_system() 
\ No newline at end of file
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+import time
+import logging
+import tempfile
+import tracemalloc
+import sys
+import os
+
+import numpy as np
+from PIL import Image
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.raid_manager import RAIDManager
+from storage.galois import GF_GENERATOR, gf_mul_xor, gf_pow
+from storage.kernels import gf_combine, xor_blocks
+
+def legacy_parity_raid6(segments):
+    """Original roll-based Q parity, kept only as a benchmark baseline"""
+    R1, R2, R3 = segments
+    P = np.bitwise_xor(np.bitwise_xor(R1, R2), R3)
+    Q = np.bitwise_xor(
+        np.bitwise_xor(
+            np.roll(R1, 1, axis=0),
+            np.roll(R2, -1, axis=0)
+        ),
+        R3
+    )
+    return P, Q
+
+def chained_xor(segments):
+    """Allocating XOR chain used by the original RAID 5 parity/recovery code"""
+    result = segments[0].copy()
+    for segment in segments[1:]:
+        result = np.bitwise_xor(result, segment)
+    return result
+
+def unfused_pq(segments):
+    """Per-parity, unblocked P+Q encode (one full pass per parity row)"""
+    parities = []
+    for j in range(2):
+        parity = np.zeros(segments[0].size, dtype=np.uint8)
+        for i, segment in enumerate(segments):
+            gf_mul_xor(gf_pow(GF_GENERATOR, i * j), segment.reshape(-1), parity)
+        parities.append(parity)
+    return parities
+
+def measure_allocations(func, segments):
+    """Peak bytes allocated by one call of func"""
+    tracemalloc.start()
+    func(segments)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def measure_throughput(func, segments, repeat=5):
+    """Return the best MB/s of func over the data segments"""
+    total_bytes = sum(segment.nbytes for segment in segments)
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func(segments)
+        best = min(best, time.perf_counter() - start_time)
+    return total_bytes / best / 1e6
+
+def benchmark_raid6(segment_shape=(1024, 1024, 3), repeat=5):
+    """Compare GF(2^8) P+Q encode/recovery throughput with the roll-based code"""
+    logger = logging.getLogger(__name__)
+    raid_manager = RAIDManager(tempfile.mkdtemp())
+    rng = np.random.default_rng(0)
+    segments = [rng.integers(0, 256, segment_shape, dtype=np.uint8) for _ in range(3)]
+    parities = raid_manager.calculate_parity_raid6(segments)
+
+    results = {
+        'legacy_encode': measure_throughput(legacy_parity_raid6, segments, repeat),
+        'gf_encode': measure_throughput(raid_manager.calculate_parity_raid6, segments, repeat),
+        'gf_recover_two_data': measure_throughput(
+            lambda s: raid_manager.recover_raid6([None, None, s[2]], parities), segments, repeat),
+        'gf_recover_data_and_p': measure_throughput(
+            lambda s: raid_manager.recover_raid6([s[0], None, s[2]], (None, parities[1])), segments, repeat),
+    }
+
+    for name, mb_per_sec in results.items():
+        logger.info(f"{name}: {mb_per_sec:.1f} MB/s")
+    return results
+
+def benchmark_parity_kernels(segment_shape=(1024, 1024, 3), data_shards=4, repeat=5):
+    """Compare allocating XOR/GF chains with the blocked out= kernels
+
+    Reports MB/s and peak bytes allocated per call; the kernels write
+    into pre-allocated buffers and allocate one block of scratch at most.
+    """
+    logger = logging.getLogger(__name__)
+    rng = np.random.default_rng(0)
+    segments = [rng.integers(0, 256, segment_shape, dtype=np.uint8) for _ in range(data_shards)]
+    xor_out = np.empty_like(segments[0])
+    pq_out = [np.empty_like(segments[0]) for _ in range(2)]
+    pq_rows = [[gf_pow(GF_GENERATOR, i * j) for i in range(data_shards)] for j in range(2)]
+
+    cases = {
+        'xor_chained': chained_xor,
+        'xor_blocks_out': lambda s: xor_blocks(s, xor_out),
+        'pq_unfused': unfused_pq,
+        'pq_fused_out': lambda s: gf_combine(pq_rows, s, pq_out),
+    }
+    results = {}
+    for name, func in cases.items():
+        results[name] = {
+            'mb_per_sec': measure_throughput(func, segments, repeat),
+            'peak_alloc_bytes': measure_allocations(func, segments),
+        }
+        logger.info(f"{name}: {results[name]['mb_per_sec']:.1f} MB/s, "
+                    f"{results[name]['peak_alloc_bytes'] / 1e6:.2f} MB allocated per call")
+    return results
+
+def benchmark_encode_many(image_count=32, image_shape=(768, 1024, 3), repeat=1):
+    """Measure bulk ingest images/sec as the process pool grows"""
+    logger = logging.getLogger(__name__)
+    storage_path = tempfile.mkdtemp()
+    raid_manager = RAIDManager(storage_path, data_shards=3, parity_shards=2)
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(image_count):
+        path = os.path.join(storage_path, f"bench_{i}.png")
+        Image.fromarray(rng.integers(0, 256, image_shape, dtype=np.uint8)).save(path)
+        paths.append(path)
+
+    results = {}
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    for workers in worker_counts:
+        best = float('inf')
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            for encoded in raid_manager.encode_many(paths, max_workers=workers):
+                encoded.release()
+            best = min(best, time.perf_counter() - start_time)
+        results[workers] = image_count / best
+        logger.info(f"encode_many with {workers} workers: {results[workers]:.1f} images/sec")
+    return results
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger(__name__)
+
+    logger.info("Starting RAID Benchmarks")
+    logger.info("========================")
+
+    logger.info("\nRAID 6 P+Q throughput")
+    benchmark_raid6()
+
+    logger.info("\nParity kernels (allocating vs out= buffers)")
+    benchmark_parity_kernels()
+
+    logger.info("\nBulk ingest (encode_many)")
+    benchmark_encode_many()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import time
+import logging
+import threading
+from collections import namedtuple, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from prometheus_client import Counter, Gauge, CollectorRegistry
+from scripts.recovery_scheduler import TokenBucket
+from storage.checksum import shard_checksum, verify_checksum
+
+ShardMove = namedtuple('ShardMove', ['object_id', 'stripe', 'shard_index', 'source', 'source_path', 'target', 'nbytes'])
+
+class Rebalancer:
+    """Redistribute shards after workers are added or removed
+
+    plan() compares every catalogued stripe with its placement-ring
+    workers and only moves shards that sit on a worker outside that set
+    (or share a worker with another shard of the stripe), so a membership
+    change moves the minimum number of shards. run() copies them with
+    bounded concurrency and bandwidth; the catalog is switched to the new
+    copy before the old one is deleted, so reads keep working throughout.
+    Each move holds the object's lock from object_locks (shared with
+    updates and the scrubber), so no write can land on the old copy.
+    """
+
+    def __init__(self, catalog, placement, read_shard, write_shard, delete_shard, shard_path,
+                 max_concurrent_moves=4, bandwidth_bytes_per_sec=None, registry=None, object_locks=None):
+        self.catalog = catalog
+        self.placement = placement
+        self.read_shard = read_shard
+        self.write_shard = write_shard
+        self.delete_shard = delete_shard
+        self.shard_path = shard_path
+        self.object_locks = object_locks if object_locks is not None else defaultdict(threading.Lock)
+        self.max_concurrent_moves = max_concurrent_moves
+        self.bandwidth = TokenBucket(bandwidth_bytes_per_sec)
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+
+        # Metrics with custom registry
+        self.registry = registry or CollectorRegistry()
+        self.moves_planned = Gauge(
+            'rebalance_moves_planned',
+            'Shard moves in the current rebalance',
+            registry=self.registry
+        )
+        self.moves_done = Counter(
+            'rebalance_moves_total',
+            'Shard moves executed',
+            ['success'],
+            registry=self.registry
+        )
+        self.bytes_moved = Counter(
+            'rebalance_bytes_moved_total',
+            'Shard bytes copied by the rebalancer',
+            registry=self.registry
+        )
+        self.progress = Gauge(
+            'rebalance_progress_ratio',
+            'Fraction of planned shard moves completed',
+            registry=self.registry
+        )
+
+    def plan(self):
+        """Compute the shard moves needed to match the placement ring"""
+        moves = []
+        for record in self.catalog.list_objects():
+            object_id = record['object_id']
+            stripes = {}
+            for shard in self.catalog.shards_for_object(object_id):
+                stripes.setdefault(shard['stripe'], []).append(shard)
+
+            shard_count = record['data_shards'] + record['parity_shards']
+            targets = self.placement.place(object_id, shard_count)
+            for shards in stripes.values():
+                # Keep every shard already on a target worker (once per worker)
+                keep, misplaced = set(), []
+                for shard in shards:
+                    if shard['node'] in targets and shard['node'] not in keep:
+                        keep.add(shard['node'])
+                    else:
+                        misplaced.append(shard)
+                free = [node for node in targets if node not in keep]
+                for shard, target in zip(misplaced, free):
+                    moves.append(ShardMove(object_id, shard['stripe'], shard['shard_index'],
+                                           shard['node'], shard['path'], target, shard['nbytes'] or 0))
+        return moves
+
+    def _move(self, move):
+        source = {'node': move.source, 'path': move.source_path}
+        target = {'node': move.target, 'path': self.shard_path(move.target, move.object_id, move.shard_index)}
+
+        with self.object_locks[move.object_id]:
+            current = next((shard for shard in self.catalog.shards_for_object(move.object_id)
+                            if shard['stripe'] == move.stripe and shard['shard_index'] == move.shard_index), None)
+            if current is None or current['node'] != move.source or current['path'] != move.source_path:
+                raise RuntimeError("Shard was moved or removed after the plan was made")
+
+            data = self.read_shard(source)
+            checksum = current['checksum'] or shard_checksum(data)
+            if not verify_checksum(data, checksum):
+                raise IOError(f"Source shard {source['path']} does not match its checksum")
+            self.bandwidth.consume(data.nbytes)
+            self.write_shard(target, data)
+            # Only a verified copy replaces the source
+            if not verify_checksum(self.read_shard(target), checksum):
+                try:
+                    self.delete_shard(target)
+                except Exception as e:
+                    self.logger.warning(f"Failed to delete bad copy {target['path']}: {e}")
+                raise IOError(f"Copy {target['path']} on {move.target} does not match the source checksum")
+            self.catalog.move_shard(move.object_id, move.shard_index, target['node'], target['path'],
+                                    stripe=move.stripe)
+            self.bytes_moved.inc(data.nbytes)
+            try:
+                self.delete_shard(source)
+            except Exception as e:
+                self.logger.warning(f"Failed to delete moved shard {source['path']}: {e}")
+        return data.nbytes
+
+    def run(self, moves=None):
+        """Execute moves (default: plan()); returns (moved, failed) counts"""
+        with self.lock:
+            moves = self.plan() if moves is None else list(moves)
+            self.moves_planned.set(len(moves))
+            self.progress.set(0 if moves else 1)
+            if not moves:
+                return 0, 0
+
+            start_time = time.monotonic()
+            self.logger.info(f"Rebalancing {len(moves)} shards "
+                             f"({sum(move.nbytes for move in moves) / 1e6:.1f} MB)")
+            moved = failed = 0
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_moves,
+                                    thread_name_prefix='rebalance') as pool:
+                futures = [(move, pool.submit(self._move, move)) for move in moves]
+                for move, future in futures:
+                    try:
+                        future.result()
+                        moved += 1
+                        self.moves_done.labels(success='true').inc()
+                    except Exception as e:
+                        failed += 1
+                        self.moves_done.labels(success='false').inc()
+                        self.logger.error(f"Failed to move shard {move.shard_index} of {move.object_id} "
+                                          f"from {move.source} to {move.target}: {e}")
+                    self.progress.set((moved + failed) / len(moves))
+
+            self.logger.info(f"Rebalance finished in {time.monotonic() - start_time:.1f}s: "
+                             f"{moved} moved, {failed} failed")
+            return moved, failed
@@ -0,0 +1,171 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry
+
+class TokenBucket:
+    """Thread-safe byte-rate limiter (None = unlimited)"""
+
+    def __init__(self, rate_bytes_per_sec=None, burst_bytes=None):
+        self.rate = rate_bytes_per_sec
+        self.capacity = burst_bytes or rate_bytes_per_sec or 0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, nbytes):
+        """Block until nbytes may be transferred"""
+        if not self.rate or nbytes <= 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Go into debt for requests larger than the bucket and sleep it off
+            self.tokens -= nbytes
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+class RecoveryScheduler:
+    """Bounded, prioritized and de-duplicated node recovery queue
+
+    Jobs run on a fixed pool of worker threads. A node that is already
+    queued or recovering is not queued twice; submit returns the existing
+    job's future. When a worker frees up, every queued node's priority is
+    re-evaluated (data at risk changes as further nodes fail) and the
+    highest one runs first. I/O inside jobs is throttled through
+    throttle(nbytes).
+    """
+
+    def __init__(self, recover_fn, priority_fn=None, max_workers=2,
+                 bandwidth_bytes_per_sec=None, registry=None):
+        self.recover_fn = recover_fn
+        self.priority_fn = priority_fn or (lambda node: 0)
+        self.max_workers = max_workers
+        self.bandwidth = TokenBucket(bandwidth_bytes_per_sec)
+        self.logger = logging.getLogger(__name__)
+
+        self.lock = threading.Condition()
+        self.queued = {}       # node -> (future, enqueue time)
+        self.running = {}      # node -> future
+        self._order = 0
+        self._shutdown = False
+
+        # Metrics with custom registry
+        self.registry = registry or CollectorRegistry()
+        self.queue_depth = Gauge(
+            'recovery_queue_depth',
+            'Nodes waiting for recovery',
+            registry=self.registry
+        )
+        self.active_jobs = Gauge(
+            'recovery_active_jobs',
+            'Node recoveries in progress',
+            registry=self.registry
+        )
+        self.job_latency = Histogram(
+            'recovery_job_duration_seconds',
+            'Recovery job latency',
+            ['phase'],
+            registry=self.registry
+        )
+        self.job_count = Counter(
+            'recovery_jobs_total',
+            'Completed recovery jobs',
+            ['success'],
+            registry=self.registry
+        )
+
+        self.workers = [
+            threading.Thread(target=self._worker, name=f'recovery-{i}', daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, node_name):
+        """Queue a node for recovery and return a future for the job's result"""
+        with self.lock:
+            if self._shutdown:
+                raise RuntimeError("Recovery scheduler is shut down")
+            if node_name in self.running:
+                self.logger.info(f"Node {node_name} is already recovering")
+                return self.running[node_name]
+            if node_name in self.queued:
+                self.logger.info(f"Node {node_name} is already queued for recovery")
+                return self.queued[node_name][0]
+
+            future = Future()
+            self.queued[node_name] = (future, time.monotonic())
+            self.queue_depth.set(len(self.queued))
+            self.lock.notify()
+            return future
+
+    def throttle(self, nbytes):
+        """Wait for recovery I/O bandwidth"""
+        self.bandwidth.consume(nbytes)
+
+    @property
+    def active_nodes(self):
+        with self.lock:
+            return set(self.running) | set(self.queued)
+
+    def pending(self):
+        with self.lock:
+            return len(self.queued)
+
+    def _next_node(self):
+        """Pick the queued node with the most data at risk (FIFO on ties)"""
+        def key(node):
+            try:
+                priority = self.priority_fn(node)
+            except Exception as e:
+                self.logger.error(f"Failed to prioritize node {node}: {e}")
+                priority = 0
+            return (priority, -self.queued[node][1])
+        return max(self.queued, key=key)
+
+    def _worker(self):
+        while True:
+            with self.lock:
+                while not self.queued and not self._shutdown:
+                    self.lock.wait()
+                if self._shutdown and not self.queued:
+                    return
+                node_name = self._next_node()
+                future, enqueued = self.queued.pop(node_name)
+                self.running[node_name] = future
+                self.queue_depth.set(len(self.queued))
+                self.active_jobs.set(len(self.running))
+
+            started = time.monotonic()
+            self.job_latency.labels(phase='queued').observe(started - enqueued)
+            if not future.set_running_or_notify_cancel():
+                success = False
+            else:
+                try:
+                    success = bool(self.recover_fn(node_name))
+                    future.set_result(success)
+                except Exception as e:
+                    self.logger.error(f"Recovery of node {node_name} failed: {e}")
+                    success = False
+                    future.set_exception(e)
+
+            finished = time.monotonic()
+            self.job_latency.labels(phase='run').observe(finished - started)
+            self.job_latency.labels(phase='total').observe(finished - enqueued)
+            self.job_count.labels(success=str(success).lower()).inc()
+            with self.lock:
+                self.running.pop(node_name, None)
+                self.active_jobs.set(len(self.running))
+
+    def shutdown(self, wait=True):
+        """Stop accepting work; queued jobs still run"""
+        with self.lock:
+            self._shutdown = True
+            self.lock.notify_all()
+        if wait:
+            for worker in self.workers:
+                worker.join()
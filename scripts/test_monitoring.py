@@ -46,7 +46,7 @@ def test_monitoring():
     
     # Initialize components
     node_manager = NodeManager()
-    node_monitor = NodeMonitor()
+    node_monitor = NodeMonitor(backend=node_manager.backend, manager=node_manager)
     perf_monitor = PerformanceMonitor()
     
     # Start monitoring threads
@@ -79,7 +79,7 @@ def test_monitoring():
 
     # Test node failure with proper simulation
     logger.info("\nTesting node failure detection...")
-    nodes = node_manager.v1.list_node(label_selector='role=worker').items
+    nodes = node_manager.backend.list_nodes(label_selector='role=worker')
     if nodes:
         test_node = nodes[0]
         node_name = test_node.metadata.name
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    object_id     TEXT PRIMARY KEY,
+    mode          TEXT NOT NULL,
+    shape         TEXT,
+    dtype         TEXT,
+    size          INTEGER,
+    data_shards   INTEGER NOT NULL,
+    parity_shards INTEGER NOT NULL,
+    created       REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shards (
+    object_id   TEXT NOT NULL REFERENCES objects(object_id) ON DELETE CASCADE,
+    stripe      INTEGER NOT NULL,
+    shard_index INTEGER NOT NULL,
+    node        TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    checksum    TEXT,
+    nbytes      INTEGER,
+    PRIMARY KEY (object_id, stripe, shard_index)
+);
+CREATE INDEX IF NOT EXISTS shards_by_node ON shards(node);
+"""
+
+_OBJECT_COLUMNS = ('object_id', 'mode', 'shape', 'dtype', 'size', 'data_shards', 'parity_shards', 'created')
+_SHARD_COLUMNS = ('object_id', 'stripe', 'shard_index', 'node', 'path', 'checksum', 'nbytes')
+
+
+class StripeCatalog:
+    """Persistent object -> stripe -> shard location index
+
+    Backed by SQLite so recovery planning is an indexed lookup instead of a
+    walk over every node's storage directory. Shard indices 0..k-1 are data
+    shards and k..k+m-1 are parity shards. Safe to share between threads.
+    """
+
+    def __init__(self, db_path):
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if db_path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _object_row(row):
+        record = dict(zip(_OBJECT_COLUMNS, row))
+        record['shape'] = tuple(json.loads(record['shape'])) if record['shape'] else None
+        return record
+
+    def register_object(self, object_id, data_shards, parity_shards, mode='image',
+                        shape=None, dtype=None, size=None):
+        """Record (or replace) an object's stripe geometry and original layout"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM objects WHERE object_id = ?", (object_id,))
+            self._conn.execute(
+                "INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (object_id, mode, json.dumps(list(shape)) if shape is not None else None,
+                 str(dtype) if dtype is not None else None, size,
+                 data_shards, parity_shards, time.time()))
+
+    def add_shard(self, object_id, shard_index, node, path, stripe=0, checksum=None, nbytes=None):
+        """Record where one shard of an object lives"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO shards VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (object_id, stripe, shard_index, node, path, checksum, nbytes))
+
+    def update_checksum(self, object_id, shard_index, checksum, stripe=0):
+        """Record a shard's new checksum after an in-place update"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE shards SET checksum = ? WHERE object_id = ? AND stripe = ? AND shard_index = ?",
+                (checksum, object_id, stripe, shard_index))
+
+    def move_shard(self, object_id, shard_index, node, path, stripe=0):
+        """Point an existing shard at a new node and path"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE shards SET node = ?, path = ? "
+                "WHERE object_id = ? AND stripe = ? AND shard_index = ?",
+                (node, path, object_id, stripe, shard_index))
+
+    def remove_object(self, object_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM objects WHERE object_id = ?", (object_id,))
+
+    def get_object(self, object_id):
+        """Return an object's record, or None if it is not catalogued"""
+        rows = self._query(
+            f"SELECT {', '.join(_OBJECT_COLUMNS)} FROM objects WHERE object_id = ?", (object_id,))
+        return self._object_row(rows[0]) if rows else None
+
+    def list_objects(self):
+        rows = self._query(f"SELECT {', '.join(_OBJECT_COLUMNS)} FROM objects ORDER BY object_id")
+        return [self._object_row(row) for row in rows]
+
+    def shards_for_object(self, object_id):
+        """All shard locations of an object, ordered by stripe and shard index"""
+        rows = self._query(
+            f"SELECT {', '.join(_SHARD_COLUMNS)} FROM shards WHERE object_id = ? "
+            "ORDER BY stripe, shard_index", (object_id,))
+        return [dict(zip(_SHARD_COLUMNS, row)) for row in rows]
+
+    def shards_on_node(self, node):
+        """All shards stored on a node"""
+        rows = self._query(
+            f"SELECT {', '.join(_SHARD_COLUMNS)} FROM shards WHERE node = ? "
+            "ORDER BY object_id, stripe, shard_index", (node,))
+        return [dict(zip(_SHARD_COLUMNS, row)) for row in rows]
+
+    def objects_on_node(self, node):
+        """Ids of the objects with at least one shard on a node"""
+        rows = self._query(
+            "SELECT DISTINCT object_id FROM shards WHERE node = ? ORDER BY object_id", (node,))
+        return [row[0] for row in rows]
@@ -0,0 +1,87 @@
+import zlib
+import logging
+import numpy as np
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import crc32c
+except ImportError:
+    crc32c = None
+
+# Shards are hashed in blocks so a range overwrite only rehashes the
+# blocks it touches
+CHECKSUM_BLOCK = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _hashers():
+    hashers = {'crc32': zlib.crc32}
+    if crc32c is not None:
+        hashers['crc32c'] = crc32c.crc32c
+    if xxhash is not None:
+        hashers['xxh64'] = xxhash.xxh64_intdigest
+    return hashers
+
+
+HASHERS = _hashers()
+# Fastest available: xxhash, then hardware crc32c, then zlib's crc32
+DEFAULT_ALGORITHM = next(name for name in ('xxh64', 'crc32c', 'crc32') if name in HASHERS)
+
+
+def _payload(data):
+    if isinstance(data, np.ndarray):
+        return memoryview(np.ascontiguousarray(data).reshape(-1).view(np.uint8))
+    return memoryview(data).cast('B')
+
+
+def block_checksums(data, algorithm=DEFAULT_ALGORITHM, block_size=CHECKSUM_BLOCK):
+    """Hash every block_size bytes of a shard payload"""
+    hasher = HASHERS[algorithm]
+    view = _payload(data)
+    return [hasher(view[start:start + block_size]) for start in range(0, max(len(view), 1), block_size)]
+
+
+def format_checksum(algorithm, block_size, digests):
+    return f"{algorithm}:{block_size}:{','.join(f'{digest:x}' for digest in digests)}"
+
+
+def parse_checksum(checksum):
+    """Split a stored checksum into (algorithm, block_size, digests)"""
+    algorithm, block_size, digests = checksum.split(':')
+    return algorithm, int(block_size), [int(digest, 16) for digest in digests.split(',')]
+
+
+def shard_checksum(data, algorithm=DEFAULT_ALGORITHM, block_size=CHECKSUM_BLOCK):
+    """Checksum string stored in the catalog for a shard payload"""
+    return format_checksum(algorithm, block_size, block_checksums(data, algorithm, block_size))
+
+
+def verify_checksum(data, checksum):
+    """True if a payload matches its stored checksum (or none was stored)"""
+    if not checksum:
+        return True
+    algorithm, block_size, digests = parse_checksum(checksum)
+    if algorithm not in HASHERS:
+        logger.warning(f"Cannot verify {algorithm} checksum: hash library not installed")
+        return True
+    return block_checksums(data, algorithm, block_size) == digests
+
+
+def updated_checksum(checksum, offset, blocks):
+    """Replace the digests of the blocks starting at block-aligned offset
+
+    blocks holds the new payload bytes of whole checksum blocks (the last
+    one may be shorter at the end of the shard).
+    """
+    algorithm, block_size, digests = parse_checksum(checksum)
+    if offset % block_size:
+        raise ValueError(f"Offset {offset} is not aligned to {block_size}-byte checksum blocks")
+    first = offset // block_size
+    new_digests = block_checksums(blocks, algorithm, block_size)
+    digests[first:first + len(new_digests)] = new_digests
+    return format_checksum(algorithm, block_size, digests)
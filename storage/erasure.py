@@ -0,0 +1,156 @@
+import numpy as np
+
+from .galois import GF_GENERATOR, gf_inv, gf_mul, gf_mul_xor, gf_pow
+from .kernels import gf_combine
+
+
+# The parity rows g^(i*j) only form an MDS code in some geometries: with up
+# to 3 parities every square submatrix is nonsingular for any k (distinct
+# g^i make the 2x2 and 3x3 minors nonzero in characteristic 2); with 4
+# parities singular submatrices appear from k=22, so k is capped at the
+# exhaustively tested 15; 5 or more fail from k=6 and are not offered.
+MAX_PARITY_SHARDS = 4
+MAX_DATA_SHARDS = {4: 15}
+
+
+def _byte_view(shard):
+    """Flat uint8 view of a shard (copies only if it is not contiguous)"""
+    return np.ascontiguousarray(shard).reshape(-1).view(np.uint8)
+
+
+def _from_byte_view(data, shape, dtype):
+    """Inverse of _byte_view"""
+    return data.view(dtype).reshape(shape)
+
+
+def invert_matrix(matrix):
+    """Invert a square matrix over GF(2^8) with Gauss-Jordan elimination"""
+    size = len(matrix)
+    rows = [list(row) + [int(i == j) for j in range(size)] for i, row in enumerate(matrix)]
+    for col in range(size):
+        pivot = next((r for r in range(col, size) if rows[r][col]), None)
+        if pivot is None:
+            raise ValueError("Matrix is singular over GF(2^8)")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        scale = gf_inv(rows[col][col])
+        rows[col] = [gf_mul(scale, value) for value in rows[col]]
+        for r in range(size):
+            factor = rows[r][col]
+            if r != col and factor:
+                rows[r] = [a ^ gf_mul(factor, b) for a, b in zip(rows[r], rows[col])]
+    return [row[size:] for row in rows]
+
+
+class ErasureCoder:
+    """Systematic k-data/m-parity Reed-Solomon coder over GF(2^8)
+
+    Parity row j uses the coefficients g^(i*j) for data shard i, so parity 0
+    is the RAID 5 XOR parity P and parity 1 is the RAID 6 Q syndrome. A
+    k+1 stripe is therefore RAID 5 and a k+2 stripe is RAID 6. Only
+    geometries that can rebuild any m lost shards are accepted: up to 3
+    parities with any k, or 4 parities with at most 15 data shards.
+    """
+
+    def __init__(self, data_shards, parity_shards):
+        if data_shards < 1 or parity_shards < 0:
+            raise ValueError("Need at least one data shard and no negative parity count")
+        if data_shards + parity_shards > 255:
+            raise ValueError("GF(2^8) supports at most 255 shards per stripe")
+        if parity_shards > MAX_PARITY_SHARDS or data_shards > MAX_DATA_SHARDS.get(parity_shards, 255):
+            raise ValueError(
+                f"{data_shards}+{parity_shards} cannot rebuild every pattern of {parity_shards} lost "
+                f"shards; use up to 3 parities, or 4 with at most {MAX_DATA_SHARDS[4]} data shards")
+        self.data_shards = data_shards
+        self.parity_shards = parity_shards
+        self.matrix = [
+            [gf_pow(GF_GENERATOR, i * j) for i in range(data_shards)]
+            for j in range(parity_shards)
+        ]
+
+    @property
+    def total_shards(self):
+        return self.data_shards + self.parity_shards
+
+    def __repr__(self):
+        return f"ErasureCoder({self.data_shards}+{self.parity_shards})"
+
+    def encode(self, segments, out=None):
+        """Compute the parity shards for k equally-sized data segments
+
+        All m parities are produced in a single blocked pass over the
+        data. Pass m pre-allocated arrays as out to fill them in place.
+        """
+        if len(segments) != self.data_shards:
+            raise ValueError(f"Expected {self.data_shards} data segments, got {len(segments)}")
+        shape, dtype = segments[0].shape, segments[0].dtype
+        if out is None:
+            out = [np.empty(shape, dtype=dtype) for _ in self.matrix]
+        gf_combine(self.matrix, segments, out)
+        return list(out)
+
+    def _generator_row(self, index):
+        if index < self.data_shards:
+            return [int(i == index) for i in range(self.data_shards)]
+        return self.matrix[index - self.data_shards]
+
+    def decode(self, shards):
+        """Rebuild the data segments from a k+m shard list
+
+        Lost shards are marked with None. Any k surviving shards are
+        enough; the returned list holds the k data segments in order.
+        """
+        if len(shards) != self.total_shards:
+            raise ValueError(f"Expected {self.total_shards} shards, got {len(shards)}")
+        surviving = [i for i, shard in enumerate(shards) if shard is not None]
+        if len(surviving) < self.data_shards:
+            raise ValueError(
+                f"Need {self.data_shards} shards to decode, only {len(surviving)} available")
+
+        data = list(shards[:self.data_shards])
+        missing = [i for i in range(self.data_shards) if data[i] is None]
+        if not missing:
+            return data
+
+        # Prefer surviving data shards: their generator rows are identity rows
+        chosen = surviving[:self.data_shards]
+        decode_matrix = invert_matrix([self._generator_row(i) for i in chosen])
+        shape, dtype = shards[chosen[0]].shape, shards[chosen[0]].dtype
+        recovered = gf_combine([decode_matrix[index] for index in missing], [shards[i] for i in chosen])
+        for index, buffer in zip(missing, recovered):
+            data[index] = _from_byte_view(buffer, shape, dtype)
+        return data
+
+    def update(self, parities, shard_index, old, new):
+        """Apply an overwrite of one data shard's bytes to its parities in place
+
+        parities hold the same byte range of each parity shard as old/new
+        do of data shard shard_index: parity_j ^= c_ij * (old ^ new). Cost
+        is proportional to the changed range, not the shard size.
+        """
+        delta = np.bitwise_xor(_byte_view(old), _byte_view(new))
+        for row, parity in zip(self.matrix, parities):
+            gf_mul_xor(row[shard_index], delta, _byte_view(parity))
+        return parities
+
+    def reconstruct(self, shards):
+        """Rebuild every lost data and parity shard of a stripe"""
+        data = self.decode(shards)
+        if all(shard is not None for shard in shards[self.data_shards:]):
+            return data + list(shards[self.data_shards:])
+        return data + self.encode(data)
+
+
+def choose_geometry(worker_count, parity_shards=None):
+    """Pick a (data_shards, parity_shards) stripe for a worker count
+
+    Each worker holds one shard of every stripe, so recovery fan-out and
+    storage overhead (m / k) follow the cluster size. Clusters of five or
+    more workers get RAID 6-level protection (two parity shards).
+    """
+    if parity_shards is None:
+        parity_shards = 2 if worker_count >= 5 else 1
+    data_shards = worker_count - parity_shards
+    if data_shards < 2:
+        raise ValueError(
+            f"{worker_count} workers cannot hold a stripe with {parity_shards} parity shards")
+    return data_shards, parity_shards
@@ -0,0 +1,78 @@
+import numpy as np
+
+# GF(2^8) arithmetic over the RAID 6 polynomial x^8 + x^4 + x^3 + x^2 + 1
+# with generator g = 2. Every table is built once at import time so that
+# segment-sized operations reduce to NumPy fancy-indexing passes.
+GF_POLY = 0x11D
+GF_GENERATOR = 2
+
+
+def _build_tables():
+    """Build exponent, logarithm, multiplication and inverse tables"""
+    exp = np.zeros(512, dtype=np.uint8)
+    log = np.zeros(256, dtype=np.int32)
+
+    value = 1
+    for power in range(255):
+        exp[power] = value
+        log[value] = power
+        value <<= 1
+        if value & 0x100:
+            value ^= GF_POLY
+    # Duplicate the cycle so exp[log[a] + log[b]] never needs a modulo
+    exp[255:510] = exp[:255]
+
+    # mul[a, b] = a * b, computed from the log tables in one vector pass
+    nonzero = np.arange(1, 256)
+    mul = np.zeros((256, 256), dtype=np.uint8)
+    mul[1:, 1:] = exp[log[nonzero][:, None] + log[nonzero][None, :]]
+
+    inv = np.zeros(256, dtype=np.uint8)
+    inv[1:] = exp[255 - log[nonzero]]
+
+    return exp, log, mul, inv
+
+
+GF_EXP, GF_LOG, GF_MUL, GF_INV = _build_tables()
+
+
+def gf_mul(a, b):
+    """Multiply two field elements"""
+    return int(GF_MUL[a, b])
+
+
+def gf_inv(a):
+    """Multiplicative inverse of a non-zero field element"""
+    if a == 0:
+        raise ZeroDivisionError("0 has no inverse in GF(2^8)")
+    return int(GF_INV[a])
+
+
+def gf_pow(a, n):
+    """Raise a field element to an integer power"""
+    if a == 0:
+        return 0 if n else 1
+    return int(GF_EXP[(int(GF_LOG[a]) * n) % 255])
+
+
+def gf_mul_array(coefficient, data, out=None):
+    """Multiply every byte of a uint8 array by a constant field element"""
+    if out is None:
+        out = np.empty_like(data)
+    if coefficient == 0:
+        out[...] = 0
+    elif coefficient == 1:
+        np.copyto(out, data)
+    else:
+        # mode='clip' avoids the temporary np.take makes for out= in 'raise' mode
+        np.take(GF_MUL[coefficient], data, out=out, mode='clip')
+    return out
+
+
+def gf_mul_xor(coefficient, data, acc):
+    """Accumulate coefficient * data into acc in place (acc ^= c * data)"""
+    if coefficient == 1:
+        np.bitwise_xor(acc, data, out=acc)
+    elif coefficient != 0:
+        np.bitwise_xor(acc, GF_MUL[coefficient][data], out=acc)
+    return acc
@@ -0,0 +1,93 @@
+import numpy as np
+
+from .galois import GF_MUL
+
+# Blocks small enough that the output block stays in cache while every
+# source is folded into it
+DEFAULT_BLOCK_BYTES = 256 * 1024
+
+# np.take widens uint8 indices to intp; widening this many at a time into
+# a reused buffer keeps table lookups allocation-free and cache-resident
+_GF_CHUNK = 16 * 1024
+
+
+def _flat(array):
+    """Flat uint8 view of an array (copies only if it is not contiguous)"""
+    return np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+
+
+def _out_view(out):
+    """Flat uint8 view of an output buffer, which must not be copied"""
+    if not out.flags.c_contiguous or not out.flags.writeable:
+        raise ValueError("Output buffers must be writable and C-contiguous")
+    return out.reshape(-1).view(np.uint8)
+
+
+def _xor_words(target, source):
+    """target ^= source over uint64 words, with a byte loop for the tail"""
+    words = target.size // 8 * 8
+    if words:
+        np.bitwise_xor(target[:words].view(np.uint64), source[:words].view(np.uint64),
+                       out=target[:words].view(np.uint64))
+    if words != target.size:
+        np.bitwise_xor(target[words:], source[words:], out=target[words:])
+
+
+def _gf_mul_into(table, source, out, indices):
+    """out = table[source] without temporaries (table is a GF_MUL row)"""
+    for start in range(0, source.size, indices.size):
+        stop = min(start + indices.size, source.size)
+        chunk = indices[:stop - start]
+        np.copyto(chunk, source[start:stop])
+        np.take(table, chunk, out=out[start:stop], mode='clip')
+    return out
+
+
+def gf_combine(rows, sources, outs=None, block_bytes=DEFAULT_BLOCK_BYTES):
+    """Compute outs[j] = sum_i rows[j][i] * sources[i] over GF(2^8) in one pass
+
+    All outputs are produced block by block, so each source block is read
+    from memory once for every output and no full-size temporaries are
+    allocated. Coefficient 1 is a plain XOR over uint64 words; other
+    coefficients go through a single block-sized scratch buffer.
+    outs (pre-allocated, any shape of the right size) are filled in place;
+    new flat uint8 buffers are allocated if omitted.
+    """
+    views = [_flat(source) for source in sources]
+    size = views[0].size
+    if outs is None:
+        outs = [np.empty(size, dtype=np.uint8) for _ in rows]
+    targets = [_out_view(out) for out in outs]
+    if any(target.size != size for target in targets):
+        raise ValueError("Output buffers must match the source size")
+
+    if any(coefficient not in (0, 1) for row in rows for coefficient in row):
+        scratch = np.empty(min(block_bytes, size), dtype=np.uint8)
+        indices = np.empty(min(_GF_CHUNK, max(size, 1)), dtype=np.intp)
+    for start in range(0, size, block_bytes):
+        stop = min(start + block_bytes, size)
+        for row, target in zip(rows, targets):
+            block = target[start:stop]
+            empty = True
+            for coefficient, view in zip(row, views):
+                if coefficient == 0:
+                    continue
+                source = view[start:stop]
+                if coefficient != 1:
+                    source = _gf_mul_into(GF_MUL[coefficient], source, scratch[:stop - start], indices)
+                if empty:
+                    np.copyto(block, source)
+                    empty = False
+                else:
+                    _xor_words(block, source)
+            if empty:
+                block[...] = 0
+    return outs
+
+
+def xor_blocks(sources, out=None, block_bytes=DEFAULT_BLOCK_BYTES):
+    """XOR equally-sized arrays into out (allocated like sources[0] if omitted)"""
+    if out is None:
+        out = np.empty(np.shape(sources[0]), dtype=np.asarray(sources[0]).dtype)
+    gf_combine([[1] * len(sources)], sources, [out], block_bytes)
+    return out
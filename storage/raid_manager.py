@@ -1,16 +1,187 @@
 import numpy as np
 from PIL import Image
 import os
+import time
 import logging
-from prometheus_client import Counter, Histogram, CollectorRegistry
-from functools import wraps
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry
+from functools import wraps, lru_cache
+from collections import namedtuple
+from dataclasses import dataclass
+from .galois import GF_GENERATOR, gf_inv, gf_mul, gf_mul_array, gf_mul_xor, gf_pow
+from .erasure import ErasureCoder, choose_geometry, _byte_view, _from_byte_view
+from .kernels import gf_combine, xor_blocks
+
+
+# One stripe of a streamed object: k data bands, their m parity bands and the
+# number of real (unpadded) rows it covers
+Stripe = namedtuple('Stripe', ['index', 'rows', 'data', 'parity'])
+
+@dataclass(frozen=True)
+class StripeDescriptor:
+    """Immutable description of one encoded object
+
+    Returned by encode_image/encode_bytes and consumed by the decode and
+    reconstruct methods, so a single RAIDManager can serve concurrent
+    operations without per-object state on the instance.
+    """
+    mode: str               # 'image' or 'bytes'
+    shape: tuple            # original array shape ((size,) in bytes mode)
+    dtype: str
+    padding: int            # padded rows (image) or bytes (bytes mode)
+    segment_shape: tuple
+    data_shards: int
+    parity_shards: int
+
+    @property
+    def size(self):
+        """Original object size in bytes"""
+        return int(np.prod(self.shape, dtype=np.int64)) * np.dtype(self.dtype).itemsize
+
+    @classmethod
+    def from_record(cls, record, segment_shape):
+        """Rebuild a descriptor from a stripe catalog record and a shard's shape"""
+        k = record['data_shards']
+        shape = tuple(record['shape'] or (record['size'],))
+        padding = segment_shape[0] * k - shape[0]
+        return cls(record['mode'], shape, str(record['dtype'] or 'uint8'), padding,
+                   tuple(segment_shape), k, record['parity_shards'])
+
+
+@lru_cache(maxsize=None)
+def _coder(data_shards, parity_shards):
+    return ErasureCoder(data_shards, parity_shards)
+
+
+# Bytes per pixel for the modes whose raw tiles can be read band by band
+_RAW_PIXEL_BYTES = {'L': 1, 'RGB': 3, 'RGBA': 4}
+
+
+def _raw_tile_offset(img):
+    """File offset of an uncompressed top-down raster, or None"""
+    if len(img.tile) != 1 or img.mode not in _RAW_PIXEL_BYTES:
+        return None
+    codec, extents, offset, args = img.tile[0]
+    if isinstance(args, str):
+        args = (args, 0, 1)
+    rawmode, stride, orientation = (tuple(args) + (0, 1))[:3]
+    row_bytes = img.size[0] * _RAW_PIXEL_BYTES[img.mode]
+    if (codec != 'raw' or extents != (0, 0) + img.size or rawmode != img.mode
+            or stride not in (0, row_bytes) or orientation != 1):
+        return None
+    return offset
+
+
+class EncodedObject:
+    """Shards of one bulk-encoded object, backed by shared memory
+
+    shards holds the k data segments followed by the m parity shards as
+    views into a single shared-memory block written by the encoding
+    process. Call release() (or use it as a context manager) once done.
+    """
+
+    def __init__(self, path, descriptor, shm_name):
+        self.path = path
+        self.descriptor = descriptor
+        self._shm = shared_memory.SharedMemory(name=shm_name)
+        count = descriptor.data_shards + descriptor.parity_shards
+        block = np.ndarray((count,) + descriptor.segment_shape,
+                           dtype=descriptor.dtype, buffer=self._shm.buf)
+        self.shards = list(block)
+
+    @property
+    def segments(self):
+        return self.shards[:self.descriptor.data_shards]
+
+    @property
+    def parities(self):
+        return self.shards[self.descriptor.data_shards:]
+
+    def release(self):
+        """Drop the views and free the shared-memory block"""
+        if self._shm is None:
+            return
+        self.shards = []
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# Per-process RAIDManager used by encode_many workers
+_worker_manager = None
+
+
+def _init_encode_worker(storage_path, data_shards, parity_shards, mode):
+    global _worker_manager
+    _worker_manager = RAIDManager(storage_path, data_shards, parity_shards, mode)
+
+
+def _encode_to_shared_memory(path):
+    """Encode one object in a worker process and publish it via shared memory"""
+    segments, descriptor = _worker_manager.encode_object(path)
+    parities = _worker_manager.encode(segments, descriptor)
+    shards = segments + parities
+    
+    nbytes = max(1, sum(shard.nbytes for shard in shards))
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    try:
+        block = np.ndarray((len(shards),) + descriptor.segment_shape,
+                           dtype=descriptor.dtype, buffer=shm.buf)
+        for target, shard in zip(block, shards):
+            np.copyto(target, shard)
+        del block
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+    # Ownership passes to the consuming process, which unlinks the block;
+    # stop this process's resource tracker from reclaiming it on exit
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    shm.close()
+    return path, descriptor, shm.name
+
+
+def _release_future(future):
+    """Free the shared memory of an encode result nobody will consume"""
+    try:
+        _, _, shm_name = future.result()
+    except Exception:
+        return
+    shm = shared_memory.SharedMemory(name=shm_name)
+    shm.close()
+    shm.unlink()
+
+
+def _with_placeholders(available_segments, lost):
+    """Copy a segment list, appending None for trailing lost segments"""
+    segments = list(available_segments)
+    if all(segment is not None for segment in segments):
+        segments.extend([None] * lost)
+    return segments
+
 
 class RAIDManager:
-    def __init__(self, storage_path):
+    MODES = ('image', 'bytes')
+    
+    def __init__(self, storage_path, data_shards=3, parity_shards=1, mode='image'):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown RAID mode {mode!r}, expected one of {self.MODES}")
         self.storage_path = storage_path
+        self.mode = mode
         os.makedirs(storage_path, exist_ok=True)
         self.logger = logging.getLogger(__name__)
         
+        # Stripe geometry: k data segments protected by m parity shards
+        self.coder = _coder(data_shards, parity_shards)
+        
         # Create a unique registry for this instance
         self.registry = CollectorRegistry()
         
@@ -27,62 +198,82 @@ class RAIDManager:
             ['type', 'success'],
             registry=self.registry
         )
+        self.encode_rate = Gauge(
+            'raid_bulk_encode_objects_per_second',
+            'Objects per second of the last encode_many batch',
+            registry=self.registry
+        )
+        
+    @property
+    def data_shards(self):
+        return self.coder.data_shards
+    
+    @property
+    def parity_shards(self):
+        return self.coder.parity_shards
+    
+    def configure_for_workers(self, worker_count, parity_shards=None):
+        """Size the stripe geometry to the live worker count"""
+        data_shards, parity_shards = choose_geometry(worker_count, parity_shards)
+        if (data_shards, parity_shards) != (self.data_shards, self.parity_shards):
+            self.logger.info(
+                f"Stripe geometry for {worker_count} workers: {data_shards}+{parity_shards}")
+            self.coder = _coder(data_shards, parity_shards)
+        return self.coder
         
     def segment_image(self, image_path):
-        """Split image into R1, R2, R3 segments"""
+        """Split image into k row segments (R1, R2, R3 for the default 3+1 stripe)"""
+        segments, _ = self.encode_image(image_path)
+        return segments
+        
+    def encode_image(self, image_path):
+        """Split image into k row segments and describe how to rebuild it"""
         self.logger.info(f"Segmenting image: {image_path}")
         img = Image.open(image_path)
         img_array = np.array(img)
+        original_shape = img_array.shape
         
-        # Store original shape for reconstruction
-        self._original_shape = img_array.shape
-        
-        # Calculate segment height (ensure divisible by 3)
+        # Calculate segment height (ensure divisible by k); read the
+        # geometry once so a concurrent reconfiguration cannot split it
+        coder = self.coder
+        k = coder.data_shards
         height = img_array.shape[0]
-        segment_height = (height + 2) // 3
-        target_height = segment_height * 3
+        segment_height = (height + k - 1) // k
+        target_height = segment_height * k
         
         # Pad image if needed
-        if height != target_height:
-            padding = target_height - height
+        padding = target_height - height
+        if padding:
             if len(img_array.shape) == 3:  # Color image
                 pad_width = ((0, padding), (0, 0), (0, 0))
             else:  # Grayscale image
                 pad_width = ((0, padding), (0, 0))
             img_array = np.pad(img_array, pad_width, mode='constant')
         
-        # Split into three equal segments
-        R1 = img_array[:segment_height]
-        R2 = img_array[segment_height:2*segment_height]
-        R3 = img_array[2*segment_height:]
-        
-        self.logger.debug(f"Original shape: {img_array.shape}")
-        self.logger.debug(f"Segment shapes: R1={R1.shape}, R2={R2.shape}, R3={R3.shape}")
-        
-        return [R1, R2, R3]  # Return as list for consistent handling
-        
-    def calculate_parity_raid5(self, segments):
-        """Calculate RAID 5 parity using XOR"""
-        R1, R2, R3 = segments
-        parity = np.bitwise_xor(np.bitwise_xor(R1, R2), R3)
-        return parity
+        # Split into k equal segments
+        segments = [img_array[i*segment_height:(i+1)*segment_height] for i in range(k)]
         
-    def calculate_parity_raid6(self, segments):
-        """Calculate RAID 6 dual parity"""
-        R1, R2, R3 = segments
+        self.logger.debug(f"Original shape: {original_shape}")
+        self.logger.debug(f"Segment shapes: {[segment.shape for segment in segments]}")
         
-        # P parity - simple XOR
-        P = np.bitwise_xor(np.bitwise_xor(R1, R2), R3)
+        descriptor = StripeDescriptor(
+            mode='image', shape=tuple(original_shape), dtype=img_array.dtype.str,
+            padding=padding, segment_shape=tuple(segments[0].shape),
+            data_shards=k, parity_shards=coder.parity_shards)
+        return segments, descriptor  # Segments as list for consistent handling
         
-        # Q parity - shifted XOR
-        Q = np.bitwise_xor(
-            np.bitwise_xor(
-                np.roll(R1, 1, axis=0),  # Shift R1 down
-                np.roll(R2, -1, axis=0)  # Shift R2 up
-            ),
-            R3  # Keep R3 as is
-        )
+    def calculate_parity_raid5(self, segments, out=None):
+        """Calculate RAID 5 parity using XOR (into out if given)"""
+        return xor_blocks(segments, out)
         
+    def calculate_parity_raid6(self, segments, out=None):
+        """Calculate RAID 6 dual parity over GF(2^8)
+
+        P is the plain XOR of the data segments and Q is the Reed-Solomon
+        syndrome Q = g^0*D0 + g^1*D1 + ... + g^(k-1)*D(k-1). out may hold
+        pre-allocated (P, Q) buffers.
+        """
+        P, Q = _coder(len(segments), 2).encode(segments, out)
         return P, Q
         
     @staticmethod
@@ -94,66 +285,294 @@ class RAIDManager:
         return decorator
 
     @time_recovery
-    def recover_raid5(self, available_segments, parity):
-        """Recover data using RAID 5"""
-        if len(available_segments) < 2:
-            raise ValueError("Need at least 2 segments for RAID 5 recovery")
-        
-        # Recover missing segment
-        recovered = parity.copy()
-        for segment in available_segments:
-            recovered = np.bitwise_xor(recovered, segment)
-        
-        # Return all segments in correct order
-        segments = list(available_segments)
-        segments.append(recovered)
+    def recover_raid5(self, available_segments, parity, out=None):
+        """Recover data using RAID 5
+
+        Missing segments are marked with None. A list without placeholders
+        is treated as the leading segments, with the lost one at the end.
+        The lost segment is XORed into out when a buffer is given.
+        """
+        segments = _with_placeholders(available_segments, 1)
+        missing = [i for i, segment in enumerate(segments) if segment is None]
+        if len(missing) > 1 or len(segments) - len(missing) < 1:
+            raise ValueError("Need all but one segment for RAID 5 recovery")
+        
+        if missing:
+            survivors = [segment for segment in segments if segment is not None]
+            segments[missing[0]] = xor_blocks([parity] + survivors, out)
+        
         self.recovery_count.labels(type='raid5', success='true').inc()
         return segments
         
     @time_recovery
     def recover_raid6(self, available_segments, parities):
-        """Recover data using RAID 6"""
+        """Recover data using RAID 6
+
+        Any two of the data segments, P and Q may be lost. Missing segments
+        and parities are marked with None. A segment list without
+        placeholders is treated as the leading segments, with the lost ones
+        at the end.
+        """
         P, Q = parities
-        if len(available_segments) < 1:
-            raise ValueError("Need at least 1 segment for RAID 6 recovery")
+        lost_parities = (P is None) + (Q is None)
+        segments = _with_placeholders(available_segments, 2 - lost_parities)
+        missing = [i for i, segment in enumerate(segments) if segment is None]
+        if len(missing) + lost_parities > 2:
+            raise ValueError("RAID 6 can recover at most two lost segments")
+        if not missing:
+            self.recovery_count.labels(type='raid6', success='true').inc()
+            return segments
         
-        S = available_segments[0]  # Known segment
+        reference = P if P is not None else Q
+        shape, dtype = reference.shape, reference.dtype
         
-        # First recover R1 using P parity
-        R1 = np.bitwise_xor(P, np.bitwise_xor(S, Q))
+        # Syndromes of the surviving data in one pass: P ^ sum(D), Q ^ sum(g^i * D)
+        survivors = [(index, segment) for index, segment in enumerate(segments) if segment is not None]
+        sources = [segment for _, segment in survivors] + [p for p in (P, Q) if p is not None]
+        rows = []
+        if P is not None:
+            rows.append([1] * len(survivors) + [1] + [0] * (Q is not None))
+        if Q is not None:
+            rows.append([gf_pow(GF_GENERATOR, index) for index, _ in survivors] + [0] * (P is not None) + [1])
+        syndromes = gf_combine(rows, sources)
+        Pxy = syndromes[0] if P is not None else None
+        Qxy = syndromes[-1] if Q is not None else None
         
-        # Then recover R2 using P parity
-        R2 = np.bitwise_xor(P, np.bitwise_xor(R1, S))
+        if len(missing) == 2:
+            # Two data segments lost: solve the 2x2 system over GF(2^8)
+            x, y = missing
+            g_yx = gf_pow(GF_GENERATOR, y - x)
+            denominator = gf_inv(g_yx ^ 1)
+            A = gf_mul(g_yx, denominator)
+            B = gf_mul(gf_inv(gf_pow(GF_GENERATOR, x)), denominator)
+            Dx = gf_mul_array(A, Pxy)
+            gf_mul_xor(B, Qxy, Dx)
+            Dy = np.bitwise_xor(Pxy, Dx)
+            segments[x] = _from_byte_view(Dx, shape, dtype)
+            segments[y] = _from_byte_view(Dy, shape, dtype)
+        elif P is not None:
+            # Single data segment lost: P alone rebuilds it
+            segments[missing[0]] = _from_byte_view(Pxy, shape, dtype)
+        else:
+            # Single data segment and P lost: divide the Q syndrome by g^x
+            x = missing[0]
+            Dx = gf_mul_array(gf_inv(gf_pow(GF_GENERATOR, x)), Qxy)
+            segments[x] = _from_byte_view(Dx, shape, dtype)
         
-        # Verify basic recovery
-        recovered = [R1, R2, S]
+        self.recovery_count.labels(type='raid6', success='true').inc()
+        return segments
+
+    def segment_bytes(self, object_path):
+        """Split the raw bytes of any file into k equal uint8 segments"""
+        segments, _ = self.encode_bytes(object_path)
+        return segments
         
-        # Try to improve recovery using Q parity if needed
-        Q_verify = np.bitwise_xor(
-            np.bitwise_xor(
-                np.roll(R1, 1, axis=0),
-                np.roll(R2, -1, axis=0)
-            ),
-            S
-        )
+    def encode_bytes(self, object_path):
+        """Split the raw bytes of any file into k segments and describe them
+
+        The file is never decoded: segments are np.frombuffer views of its
+        bytes, so recovery returns a byte-identical object.
+        """
+        self.logger.info(f"Segmenting object bytes: {object_path}")
+        with open(object_path, 'rb') as f:
+            data = np.frombuffer(f.read(), dtype=np.uint8)
         
-        if not np.array_equal(Q_verify, Q):
-            self.logger.warning("Q parity verification failed")
-            # Try alternative R1 using Q parity
-            R1_alt = np.roll(
-                np.bitwise_xor(Q, np.bitwise_xor(np.roll(R2, -1, axis=0), S)),
-                -1, axis=0
-            )
-            # Use R1_alt if it improves P parity
-            P_verify_alt = np.bitwise_xor(np.bitwise_xor(R1_alt, R2), S)
-            if np.abs(P_verify_alt - P).mean() < np.abs(np.bitwise_xor(np.bitwise_xor(R1, R2), S) - P).mean():
-                recovered[0] = R1_alt
+        coder = self.coder
+        k = coder.data_shards
+        segment_size = max(1, (data.size + k - 1) // k)
+        segments = [data[i*segment_size:(i+1)*segment_size] for i in range(k)]
         
-        self.recovery_count.labels(type='raid6', success='true').inc()
-        return recovered
+        # Only the short tail segments are copied to pad them
+        for i, segment in enumerate(segments):
+            if segment.size != segment_size:
+                padded = np.zeros(segment_size, dtype=np.uint8)
+                padded[:segment.size] = segment
+                segments[i] = padded
+        
+        self.logger.debug(f"Object size: {data.size}, segment size: {segment_size}")
+        descriptor = StripeDescriptor(
+            mode='bytes', shape=(data.size,), dtype=np.dtype(np.uint8).str,
+            padding=segment_size * k - data.size, segment_shape=(segment_size,),
+            data_shards=k, parity_shards=coder.parity_shards)
+        return segments, descriptor
+        
+    def reconstruct_bytes(self, segments, descriptor=None):
+        """Reassemble the original bytes from k data segments"""
+        data = np.concatenate([np.asarray(segment, dtype=np.uint8).reshape(-1) for segment in segments])
+        if descriptor is not None:
+            data = data[:descriptor.size]
+        return data.tobytes()
+        
+    def save_bytes(self, data, output_path):
+        """Save object bytes to file"""
+        try:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to save object: {e}")
+            return False
+        
+    def segment_object(self, object_path):
+        """Segment an object using the configured mode (image or bytes)"""
+        segments, _ = self.encode_object(object_path)
+        return segments
+        
+    def encode_object(self, object_path):
+        """Segment and describe an object using the configured mode"""
+        if self.mode == 'bytes':
+            return self.encode_bytes(object_path)
+        return self.encode_image(object_path)
+        
+    def reconstruct_object(self, segments, descriptor=None):
+        """Reassemble an object (Image or bytes) in its descriptor's mode"""
+        mode = descriptor.mode if descriptor is not None else self.mode
+        if mode == 'bytes':
+            return self.reconstruct_bytes(segments, descriptor)
+        return self.reconstruct_image(segments, descriptor)
+        
+    def iter_image_stripes(self, image_path, band_rows=64):
+        """Stream an image as k+m stripes without decoding it into one array
 
-    def reconstruct_image(self, segments):
-        """Reconstruct image from segments"""
+        Each stripe holds k bands of band_rows rows; parity is accumulated
+        band by band as they are read. Uncompressed top-down rasters (PPM,
+        PGM, raw TIFF) are read straight from their byte ranges, so peak
+        memory is one stripe. Other formats are cropped band by band from
+        PIL's decoder, which avoids the full-size array and padding copies.
+        """
+        self.logger.info(f"Streaming stripes for image: {image_path}")
+        coder = self.coder
+        k = coder.data_shards
+        with Image.open(image_path) as img:
+            width, height = img.size
+            raw_offset = _raw_tile_offset(img)
+            channels = _RAW_PIXEL_BYTES[img.mode] if raw_offset is not None else None
+            
+            with open(image_path, 'rb') as raw_file:
+                for index, stripe_top in enumerate(range(0, height, band_rows * k)):
+                    data, parity = [], None
+                    for i in range(k):
+                        top = stripe_top + i * band_rows
+                        rows = max(0, min(band_rows, height - top))
+                        if raw_offset is not None:
+                            band = self._read_raw_band(raw_file, raw_offset, top, rows, width, channels)
+                        else:
+                            band = np.asarray(img.crop((0, top, width, top + rows))) if rows else None
+                        if band is None or rows < band_rows:
+                            band = self._pad_band(band, band_rows, width, img, data)
+                        
+                        # Fold the band into every parity band: P ^= c * D
+                        # (parities share the band's shape and dtype, as in encode)
+                        if parity is None:
+                            parity = [np.zeros(band.shape, dtype=band.dtype) for _ in range(coder.parity_shards)]
+                        for row, parity_band in zip(coder.matrix, parity):
+                            gf_mul_xor(row[i], _byte_view(band), _byte_view(parity_band))
+                        data.append(band)
+                    
+                    yield Stripe(index, min(band_rows * k, height - stripe_top), data, parity)
+                    
+    @staticmethod
+    def _read_raw_band(raw_file, offset, top, rows, width, channels):
+        """Read rows of an uncompressed raster directly from the file"""
+        if not rows:
+            return None
+        row_bytes = width * channels
+        raw_file.seek(offset + top * row_bytes)
+        band = np.frombuffer(raw_file.read(rows * row_bytes), dtype=np.uint8)
+        shape = (rows, width, channels) if channels > 1 else (rows, width)
+        return band.reshape(shape)
+        
+    @staticmethod
+    def _pad_band(band, band_rows, width, img, previous):
+        """Zero-pad a short (or absent) trailing band to band_rows rows"""
+        if band is None:
+            template = previous[0] if previous else np.asarray(img.crop((0, 0, width, 1)))
+            shape, dtype = (band_rows,) + template.shape[1:], template.dtype
+            return np.zeros(shape, dtype=dtype)
+        padded = np.zeros((band_rows,) + band.shape[1:], dtype=band.dtype)
+        padded[:band.shape[0]] = band
+        return padded
+        
+    def assemble_stripes(self, stripes):
+        """Reassemble an image from (recovered) stripes"""
+        bands = []
+        for stripe in stripes:
+            rows = np.concatenate(stripe.data)[:stripe.rows]
+            bands.append(rows)
+        return Image.fromarray(np.concatenate(bands))
+        
+    def encode_many(self, paths, max_workers=None):
+        """Bulk-encode objects (k segments + m parities) in a process pool
+
+        Yields an EncodedObject per path, in input order. Workers decode and
+        encode outside this process's GIL and hand shards back through
+        shared memory instead of pickling arrays. At most two objects per
+        worker are in flight, which bounds shared-memory use.
+        """
+        paths = list(paths)
+        max_workers = max_workers or os.cpu_count() or 1
+        coder = self.coder
+        start_time = time.perf_counter()
+        encoded = 0
+        
+        pending = deque()
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_encode_worker,
+            initargs=(self.storage_path, coder.data_shards, coder.parity_shards, self.mode),
+        ) as executor:
+            try:
+                remaining = iter(paths)
+                for path in remaining:
+                    pending.append(executor.submit(_encode_to_shared_memory, path))
+                    if len(pending) >= 2 * max_workers:
+                        break
+                while pending:
+                    path, descriptor, shm_name = pending.popleft().result()
+                    next_path = next(remaining, None)
+                    if next_path is not None:
+                        pending.append(executor.submit(_encode_to_shared_memory, next_path))
+                    encoded += 1
+                    yield EncodedObject(path, descriptor, shm_name)
+            finally:
+                # Free results that were produced but never consumed
+                for future in pending:
+                    _release_future(future)
+        
+        elapsed = time.perf_counter() - start_time
+        if encoded and elapsed > 0:
+            rate = encoded / elapsed
+            self.encode_rate.set(rate)
+            self.logger.info(f"Bulk encoded {encoded} objects with {max_workers} workers: {rate:.2f} objects/sec")
+        
+    def _coder_for(self, descriptor):
+        if descriptor is None:
+            return self.coder
+        return _coder(descriptor.data_shards, descriptor.parity_shards)
+        
+    def encode(self, segments, descriptor=None, out=None):
+        """Compute the m parity shards of the k+m stripe (descriptor's geometry if given)"""
+        return self._coder_for(descriptor).encode(segments, out)
+        
+    def update_parity(self, parities, segment_index, old_data, new_data, descriptor=None):
+        """Delta-update parity ranges in place for an overwrite of one segment range
+
+        new parity = old parity ^ c * (old data ^ new data), with c = 1 for P.
+        parities must be writable uint8 arrays covering the same byte range.
+        """
+        return self._coder_for(descriptor).update(parities, segment_index, old_data, new_data)
+        
+    @time_recovery
+    def decode(self, shards, descriptor=None):
+        """Recover the k data segments from any k of the k+m shards (None = lost)"""
+        coder = self._coder_for(descriptor)
+        segments = coder.decode(shards)
+        self.recovery_count.labels(type=f'rs{coder.data_shards}+{coder.parity_shards}', success='true').inc()
+        return segments
+
+    def reconstruct_image(self, segments, descriptor=None):
+        """Reconstruct image from segments, trimmed to the descriptor's shape"""
         try:
             # Convert segments to list if it's a numpy array
             if isinstance(segments, np.ndarray):
@@ -166,12 +585,8 @@ class RAIDManager:
             full_image = np.vstack(segments)
             
             # Trim to original shape if needed
-            if hasattr(self, '_original_shape'):
-                full_image = full_image[:self._original_shape[0]]
-                if len(self._original_shape) > 2:
-                    full_image = full_image[:, :self._original_shape[1], :self._original_shape[2]]
-                else:
-                    full_image = full_image[:, :self._original_shape[1]]
+            if descriptor is not None:
+                full_image = full_image[tuple(slice(0, n) for n in descriptor.shape)]
             
             # Ensure uint8 type
             if full_image.dtype != np.uint8:
@@ -0,0 +1,143 @@
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+
+from .shard_server import DEFAULT_PORT, MAX_HEADER, encode_key
+
+
+class ShardServerError(Exception):
+    """The shard server answered a request with ERR"""
+
+
+class _Connection:
+    """A pooled socket with a buffered reader for response headers"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.rfile = sock.makefile('rb')
+        # Set once the current request's response has been read completely
+        self.framed = False
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+
+class ShardClient:
+    """Connection-pooled client for one worker's shard server
+
+    Up to pool_size sockets are kept open and reused across requests, so
+    moving many shards never pays a connection setup per segment. Bodies
+    are sent from and received into buffers without intermediate copies.
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, pool_size=4, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return _Connection(sock)
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection
+
+        It goes back to the pool only after a fully framed response (OK
+        with its whole body, or an ERR line); otherwise the protocol
+        state is unknown and the socket is closed.
+        """
+        with self._slots:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._connect()
+            conn.framed = False
+            try:
+                yield conn
+            finally:
+                if conn.framed:
+                    with self._lock:
+                        self._idle.append(conn)
+                else:
+                    conn.close()
+
+    @staticmethod
+    def _read_status(conn):
+        line = conn.rfile.readline(MAX_HEADER)
+        if not line.endswith(b"\n"):
+            raise ConnectionError("Shard server closed the connection")
+        status, _, value = line.decode().rstrip("\n").partition(" ")
+        if status != "OK":
+            raise ShardServerError(value)
+        return int(value)
+
+    @staticmethod
+    def _recv_into(conn, buffer):
+        view = memoryview(buffer).cast('B')
+        received = 0
+        while received < len(view):
+            count = conn.rfile.readinto(view[received:])
+            if not count:
+                raise ConnectionError("Shard server closed the connection mid-body")
+            received += count
+        return buffer
+
+    def _request(self, verb, key, *args, payloads=(), expect_body=False):
+        header = " ".join([verb, encode_key(key)] + [str(int(arg)) for arg in args]) + "\n"
+        with self._connection() as conn:
+            conn.sock.sendall(header.encode())
+            for payload in payloads:
+                conn.sock.sendall(payload)
+            try:
+                length = self._read_status(conn)
+            except ShardServerError:
+                # An ERR line is a complete response
+                conn.framed = True
+                raise
+            body = self._recv_into(conn, bytearray(length)) if expect_body else length
+            conn.framed = True
+            return body
+
+    def put(self, key, *payloads):
+        """Store the concatenation of one or more bytes-like payloads"""
+        views = [memoryview(payload).cast('B') for payload in payloads]
+        self._request("PUT", key, sum(len(view) for view in views), payloads=views)
+
+    def patch(self, key, offset, *payloads):
+        """Overwrite bytes of a stored shard in place, starting at offset"""
+        views = [memoryview(payload).cast('B') for payload in payloads]
+        self._request("PATCH", key, offset, sum(len(view) for view in views), payloads=views)
+
+    def get(self, key):
+        return self._request("GET", key, expect_body=True)
+
+    def range_get(self, key, offset, length):
+        return self._request("RANGE", key, offset, length, expect_body=True)
+
+    def head(self, key):
+        """Size of a stored shard in bytes"""
+        return self._request("HEAD", key)
+
+    def exists(self, key):
+        try:
+            self.head(key)
+            return True
+        except ShardServerError:
+            return False
+
+    def delete(self, key):
+        self._request("DELETE", key)
+
+    def close(self):
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle.clear()
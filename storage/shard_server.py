@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Worker-side shard server
+
+Serves the shards under a worker's storage root over a persistent TCP
+connection. Each request is one header line, optionally followed by a
+body; connections stay open for any number of requests:
+
+    PUT <key> <length>\\n<body>                  ->  OK 0\\n
+    PATCH <key> <offset> <length>\\n<body>       ->  OK 0\\n
+    GET <key>\\n                                 ->  OK <length>\\n<body>
+    RANGE <key> <offset> <length>\\n             ->  OK <length>\\n<body>
+    HEAD <key>\\n                                ->  OK <size>\\n
+    DELETE <key>\\n                              ->  OK 0\\n
+
+Keys are paths relative to the storage root, percent-encoded so they
+never contain whitespace. Failed requests are answered with
+``ERR <message>\\n`` and leave the connection usable (request bodies are
+always consumed). A malformed header is answered with ERR and the
+connection is closed, since the body length cannot be trusted. This
+module only depends on the standard library so it runs in a bare python
+image.
+"""
+import os
+import asyncio
+import logging
+import argparse
+import threading
+from urllib.parse import quote, unquote
+
+DEFAULT_PORT = 7070
+CHUNK_SIZE = 1024 * 1024
+MAX_HEADER = 4096
+
+# Integer arguments after the key, per verb
+ARGUMENTS = {'PUT': 1, 'PATCH': 2, 'GET': 0, 'RANGE': 2, 'HEAD': 0, 'DELETE': 0}
+
+
+def encode_key(key):
+    """Wire form of a key (no whitespace or newlines)"""
+    return quote(key, safe='/')
+
+
+def parse_header(line):
+    """Split a request line into (verb, key, [integers]); ValueError if malformed"""
+    verb, *args = line.decode('ascii').rstrip("\n").split(" ")
+    verb = verb.upper()
+    if verb not in ARGUMENTS or len(args) != ARGUMENTS[verb] + 1 or not args[0]:
+        raise ValueError(f"Malformed request: {line[:80]!r}")
+    numbers = [int(arg) for arg in args[1:]]
+    if any(number < 0 for number in numbers):
+        raise ValueError(f"Negative size in request: {line[:80]!r}")
+    return verb, unquote(args[0]), numbers
+
+
+class ShardServer:
+    def __init__(self, root, host='0.0.0.0', port=DEFAULT_PORT):
+        self.root = os.path.abspath(root)
+        self.host = host
+        self.port = port
+        os.makedirs(self.root, exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._connections = set()
+
+    def _resolve(self, key):
+        """Map a key to a path under the root, rejecting traversal"""
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.isabs(key) or not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid key: {key}")
+        return path
+
+    async def _send_file(self, writer, path, offset=0, length=None):
+        """Answer with a byte range of a shard file (all of it by default)
+
+        The length is taken from the open handle, which is also the one
+        sent from: a PUT renaming a new shard into place meanwhile cannot
+        make the advertised length differ from the bytes sent.
+        """
+        # Open before answering, so a missing file is still a clean ERR
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            offset = min(offset, size)
+            length = size - offset if length is None else min(length, size - offset)
+            writer.write(f"OK {length}\n".encode())
+            try:
+                # sendfile() where the transport supports it, chunked copy otherwise
+                await self._loop.sendfile(writer.transport, f, offset, length, fallback=True)
+            except OSError as e:
+                # Part of the body may be sent: the connection cannot recover
+                raise ConnectionError(f"Failed sending {path}: {e}") from e
+
+    async def _put(self, reader, path, length):
+        """Receive a body into a temporary file and rename it into place
+
+        The whole body is read even if writing fails, so the connection
+        stays in sync; the write error is raised afterwards.
+        """
+        tmp_path = f"{path}.{id(reader)}.tmp"
+        error = None
+        f = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(tmp_path, 'wb')
+        except OSError as e:
+            error = e
+        try:
+            remaining = length
+            while remaining:
+                chunk = await reader.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ConnectionError("Connection closed during PUT body")
+                remaining -= len(chunk)
+                if error is None:
+                    try:
+                        f.write(chunk)
+                    except OSError as e:
+                        error = e
+            if f is not None:
+                f.close()
+            if error is not None:
+                raise error
+            os.replace(tmp_path, path)
+        finally:
+            if f is not None:
+                f.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def _patch(self, reader, path, offset, length):
+        body = await reader.readexactly(length)
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _handle_request(self, reader, writer, verb, key, args):
+        if verb == 'PUT':
+            length, = args
+            try:
+                path = self._resolve(key)
+            except ValueError:
+                # Drain the body so the connection stays in sync
+                await reader.readexactly(length)
+                raise
+            await self._put(reader, path, length)
+            writer.write(b"OK 0\n")
+        elif verb == 'PATCH':
+            offset, length = args
+            try:
+                path = self._resolve(key)
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"No such shard: {key}")
+            except (ValueError, OSError):
+                await reader.readexactly(length)
+                raise
+            await self._patch(reader, path, offset, length)
+            writer.write(b"OK 0\n")
+        elif verb == 'GET':
+            await self._send_file(writer, self._resolve(key))
+        elif verb == 'RANGE':
+            offset, length = args
+            await self._send_file(writer, self._resolve(key), offset, length)
+        elif verb == 'HEAD':
+            writer.write(f"OK {os.path.getsize(self._resolve(key))}\n".encode())
+        elif verb == 'DELETE':
+            path = self._resolve(key)
+            if os.path.exists(path):
+                os.remove(path)
+            writer.write(b"OK 0\n")
+
+    async def _handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if len(line) > MAX_HEADER or not line.endswith(b"\n"):
+                    writer.write(b"ERR header too long\n")
+                    break
+                try:
+                    verb, key, args = parse_header(line)
+                except ValueError as e:
+                    # The body length is unknown, so the stream cannot be resynced
+                    self.logger.warning(f"Closing connection from {peer}: {e}")
+                    message = str(e).replace("\n", " ")
+                    writer.write(f"ERR {message}\n".encode())
+                    break
+                try:
+                    await self._handle_request(reader, writer, verb, key, args)
+                except ConnectionError:
+                    raise
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"Request {verb} {key} from {peer} failed: {e}")
+                    message = str(e).replace("\n", " ")
+                    writer.write(f"ERR {message}\n".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Client went away, or the server is shutting down
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def start(self):
+        """Start listening; the bound port is stored in self.port"""
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info(f"Shard server on {self.host}:{self.port} serving {self.root}")
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_background(self):
+        """Run the server on its own event loop thread and return the port"""
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+            loop.run_until_complete(self._close())
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name=f'shard-server-{self.port}', daemon=True)
+        self._thread.start()
+        started.wait()
+        return self.port
+
+    async def _close(self):
+        self._server.close()
+        connections = list(self._connections)
+        for task in connections:
+            task.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def stop(self):
+        """Stop a server started with start_background"""
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve worker shards over TCP")
+    parser.add_argument('--root', default='/storage')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    options = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(ShardServer(options.root, options.host, options.port).serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import os
+import struct
+import logging
+import threading
+import numpy as np
+
+from .kernels import DEFAULT_BLOCK_BYTES, xor_blocks
+
+# Fixed 128-byte shard header:
+#   magic (8s) | version (H) | ndim (B) | dtype descr (8s) | shape (8 x Q)
+# The payload starts at HEADER_SIZE so every shard is 64-byte aligned and
+# can be mapped straight from the page cache.
+SHARD_MAGIC = b'RAIDSHRD'
+SHARD_VERSION = 1
+HEADER_SIZE = 128
+MAX_DIMS = 8
+_HEADER = struct.Struct(f'<8sHB8s{MAX_DIMS}Q')
+_NPY_MAGIC = b'\x93NUMPY'
+
+
+class ShardStore:
+    """Memory-mapped storage for data and parity shards
+
+    Shards are written with a fixed header followed by the raw array bytes.
+    Reads return read-only np.memmap views, so recovery reads pages from
+    the page cache instead of loading whole shards into RAM. Legacy .npy
+    shards are opened with np.load(mmap_mode='r').
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def _pack_header(shape, dtype):
+        if len(shape) > MAX_DIMS:
+            raise ValueError(f"Shards support at most {MAX_DIMS} dimensions")
+        descr = np.dtype(dtype).str.encode('ascii')
+        dims = tuple(shape) + (0,) * (MAX_DIMS - len(shape))
+        header = _HEADER.pack(SHARD_MAGIC, SHARD_VERSION, len(shape), descr, *dims)
+        return header.ljust(HEADER_SIZE, b'\0')
+
+    @staticmethod
+    def _unpack_header(raw, source):
+        magic, version, ndim, descr, *dims = _HEADER.unpack(bytes(raw[:_HEADER.size]))
+        if magic != SHARD_MAGIC or version != SHARD_VERSION:
+            raise ValueError(f"Not a shard file: {source}")
+        return tuple(dims[:ndim]), np.dtype(descr.rstrip(b'\0').decode('ascii'))
+
+    @classmethod
+    def read_header(cls, path):
+        """Return (shape, dtype) of a shard file"""
+        with open(path, 'rb') as f:
+            raw = f.read(_HEADER.size)
+        return cls._unpack_header(raw, path)
+
+    @classmethod
+    def pack_shard(cls, array):
+        """Serialize a shard as (header, payload) without copying the array"""
+        array = np.ascontiguousarray(array)
+        return cls._pack_header(array.shape, array.dtype), memoryview(array.reshape(-1).view(np.uint8))
+
+    @classmethod
+    def unpack_shard(cls, buffer):
+        """View serialized shard bytes (e.g. from the network) as an array"""
+        shape, dtype = cls._unpack_header(buffer, 'buffer')
+        return np.frombuffer(buffer, dtype=dtype, offset=HEADER_SIZE,
+                             count=int(np.prod(shape, dtype=np.int64))).reshape(shape)
+
+    @staticmethod
+    def _tmp_path(path):
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def create_shard(self, path, shape, dtype=np.uint8):
+        """Pre-allocate a shard and return a writable memmap over its payload
+
+        The shard is created under a temporary name; commit_shard renames
+        it to path once it is filled, so readers never map a zero-filled
+        or half-written shard.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = self._tmp_path(path)
+        header = self._pack_header(shape, dtype)
+        nbytes = int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.truncate(HEADER_SIZE + nbytes)
+        return np.memmap(tmp_path, dtype=dtype, mode='r+', offset=HEADER_SIZE, shape=tuple(shape))
+
+    @staticmethod
+    def commit_shard(path, shard):
+        """Flush a shard from create_shard and rename it into place"""
+        shard.flush()
+        os.replace(shard.filename, path)
+        return path
+
+    @staticmethod
+    def discard_shard(shard):
+        """Drop a shard from create_shard that will not be committed"""
+        if os.path.exists(shard.filename):
+            os.remove(shard.filename)
+
+    def write_shard(self, path, array):
+        """Write an array as a shard file
+
+        The shard is written to a temporary file next to it and renamed
+        into place, so readers that have the old shard mapped never see
+        it truncated or half written.
+        """
+        array = np.ascontiguousarray(array)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = self._tmp_path(path)
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self._pack_header(array.shape, array.dtype))
+                f.write(array.data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def open_shard(self, path):
+        """Map a shard read-only without loading it into memory"""
+        with open(path, 'rb') as f:
+            magic = f.read(len(SHARD_MAGIC))
+        if magic.startswith(_NPY_MAGIC):
+            return np.load(path, mmap_mode='r')
+        shape, dtype = self.read_header(path)
+        if 0 in shape:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=shape)
+
+    def read_range(self, path, offset, length):
+        """Read length payload bytes at offset without mapping the whole shard"""
+        with open(path, 'rb') as f:
+            f.seek(HEADER_SIZE + offset)
+            return bytearray(f.read(length))
+
+    def write_range(self, path, offset, data):
+        """Overwrite payload bytes of a shard in place"""
+        with open(path, 'r+b') as f:
+            f.seek(HEADER_SIZE + offset)
+            f.write(memoryview(data).cast('B'))
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def prefetch(shard):
+        """Ask the kernel to start reading a mapped shard into the page cache"""
+        filename = getattr(shard, 'filename', None)
+        if filename is None or not hasattr(os, 'posix_fadvise'):
+            return
+        fd = os.open(filename, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def xor_into(out, shards, block_bytes=DEFAULT_BLOCK_BYTES):
+        """XOR equally-shaped shards into out, one cache-sized block at a time"""
+        return xor_blocks(shards, out, block_bytes)
@@ -0,0 +1,713 @@
+import unittest
+from scripts.recovery_scheduler import RecoveryScheduler, TokenBucket
+from scripts.node_manager import fan_out
+from scripts.rebalancer import Rebalancer
+from scripts.scrubber import Scrubber
+from scripts.cluster_backend import FakeClusterBackend
+from scripts.node_manager import NodeManager
+from scripts.node_monitor import NodeMonitor, parse_quantity
+from monitoring.node_monitor import NodeMonitor as LivenessMonitor
+from storage.checksum import shard_checksum, verify_checksum, updated_checksum
+from storage.erasure import ErasureCoder
+from storage.catalog import StripeCatalog
+from storage.placement import PlacementRing
+from storage.shard_store import ShardStore
+import numpy as np
+from PIL import Image
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import queue
+import json
+import socket
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import time
+
+class TestRecoveryScheduler(unittest.TestCase):
+    """Recovery queue behaviour (no cluster required)"""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.started = []
+        self.risk = {}
+
+    def recover(self, node_name):
+        self.started.append(node_name)
+        self.release.wait(5)
+        return True
+
+    def test_deduplicates_queued_and_running_nodes(self):
+        scheduler = RecoveryScheduler(self.recover, max_workers=1)
+        first = scheduler.submit("worker-node-1")
+        while not self.started:
+            time.sleep(0.01)
+        self.assertIs(scheduler.submit("worker-node-1"), first)
+
+        queued = scheduler.submit("worker-node-2")
+        self.assertIs(scheduler.submit("worker-node-2"), queued)
+        self.assertEqual(scheduler.pending(), 1)
+
+        self.release.set()
+        self.assertTrue(first.result(5))
+        self.assertTrue(queued.result(5))
+        scheduler.shutdown()
+        self.assertEqual(self.started, ["worker-node-1", "worker-node-2"])
+
+    def test_most_data_at_risk_runs_first(self):
+        scheduler = RecoveryScheduler(self.recover, priority_fn=lambda node: self.risk.get(node, 0),
+                                      max_workers=1)
+        blocker = scheduler.submit("blocker")
+        while not self.started:
+            time.sleep(0.01)
+
+        self.risk = {"worker-node-2": (0, 3), "worker-node-3": (2, 1), "worker-node-4": (0, 5)}
+        futures = [scheduler.submit(node) for node in ("worker-node-2", "worker-node-3", "worker-node-4")]
+        self.release.set()
+        for future in [blocker] + futures:
+            future.result(5)
+        scheduler.shutdown()
+        self.assertEqual(self.started[1:], ["worker-node-3", "worker-node-4", "worker-node-2"])
+
+    def test_failed_job_reports_exception(self):
+        def explode(node_name):
+            raise RuntimeError("disk gone")
+        scheduler = RecoveryScheduler(explode, max_workers=2)
+        with self.assertRaises(RuntimeError):
+            scheduler.submit("worker-node-1").result(5)
+        scheduler.shutdown()
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate_bytes_per_sec=1000, burst_bytes=100)
+        start_time = time.monotonic()
+        for _ in range(3):
+            bucket.consume(100)
+        self.assertGreaterEqual(time.monotonic() - start_time, 0.15)
+
+class TestFanOutWrites(unittest.TestCase):
+    """Quorum-acknowledged parallel shard writes (no cluster required)"""
+
+    def test_returns_at_quorum_and_stragglers_finish(self):
+        slow = threading.Event()
+        def write(delay):
+            if delay:
+                slow.wait(5)
+            return delay
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            succeeded, pending = fan_out(pool, [lambda d=d: write(d) for d in (0, 0, 0, 1, 1)], quorum=3, timeout=5)
+            self.assertEqual(len(succeeded), 3)
+            self.assertEqual(len(pending), 2)
+            slow.set()
+            self.assertEqual([future.result(5) for future in pending], [1, 1])
+
+    def test_failures_beyond_quorum_raise(self):
+        def fail():
+            raise OSError("worker unreachable")
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            with self.assertRaises(RuntimeError):
+                fan_out(pool, [fail, fail, lambda: 1, lambda: 1], quorum=3)
+            succeeded, _ = fan_out(pool, [fail, lambda: 1, lambda: 1, lambda: 1], quorum=3)
+            self.assertEqual(len(succeeded), 3)
+
+class TestRebalancer(unittest.TestCase):
+    """Shard redistribution after membership changes (no cluster required)"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = ShardStore(self.test_dir)
+        self.catalog = StripeCatalog(os.path.join(self.test_dir, "catalog.db"))
+        self.nodes = [f"worker-node-{i}" for i in range(5)]
+        self.ring = PlacementRing(self.nodes)
+        self.rebalancer = Rebalancer(
+            self.catalog, self.ring,
+            read_shard=lambda shard: self.store.open_shard(shard['path']),
+            write_shard=lambda shard, array: self.store.write_shard(shard['path'], array),
+            delete_shard=lambda shard: os.remove(shard['path']),
+            shard_path=lambda node, object_id, index: os.path.join(self.test_dir, node, f"{object_id}.{index}"),
+            max_concurrent_moves=3,
+        )
+
+        rng = np.random.default_rng(3)
+        self.shards = {}
+        for i in range(40):
+            object_id = f"image_{i}.jpg"
+            self.catalog.register_object(object_id, 3, 1, shape=(30, 4, 3), dtype="uint8")
+            for index, node in enumerate(self.ring.place(object_id, 4)):
+                shard = rng.integers(0, 256, (10, 4, 3), dtype=np.uint8)
+                path = self.store.write_shard(os.path.join(self.test_dir, node, f"{object_id}.{index}"), shard)
+                self.catalog.add_shard(object_id, index, node, path, nbytes=shard.nbytes)
+                self.shards[(object_id, index)] = shard
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_balanced_cluster_needs_no_moves(self):
+        self.assertEqual(self.rebalancer.plan(), [])
+
+    def test_added_worker_receives_shards(self):
+        self.ring.update(self.nodes + ["worker-node-5"])
+        moves = self.rebalancer.plan()
+        self.assertTrue(0 < len(moves) < len(self.shards) / 2)
+        self.assertTrue(all(move.target == "worker-node-5" for move in moves))
+
+        self.assertEqual(self.rebalancer.run(moves), (len(moves), 0))
+        self.assertEqual(self.rebalancer.plan(), [])
+        for object_id in {object_id for object_id, _ in self.shards}:
+            shards = self.catalog.shards_for_object(object_id)
+            self.assertEqual(len({shard['node'] for shard in shards}), 4)
+            for shard in shards:
+                expected = self.shards[(object_id, shard['shard_index'])]
+                self.assertTrue(np.array_equal(self.store.open_shard(shard['path']), expected))
+        self.assertEqual(self.rebalancer.registry.get_sample_value('rebalance_bytes_moved_total'), sum(move.nbytes for move in moves))
+
+    def test_move_waits_for_object_updates(self):
+        self.ring.update(self.nodes + ["worker-node-5"])
+        move = self.rebalancer.plan()[0]
+        updated = self.shards[(move.object_id, move.shard_index)] ^ 0xFF
+        with self.rebalancer.object_locks[move.object_id]:
+            mover = threading.Thread(target=self.rebalancer.run, args=([move],))
+            mover.start()
+            time.sleep(0.2)
+            self.assertTrue(mover.is_alive())
+            # An update holding the lock writes to the catalogued (old) copy
+            self.store.write_shard(move.source_path, updated)
+        mover.join(10)
+
+        shard = self.catalog.shards_for_object(move.object_id)[move.shard_index]
+        self.assertEqual(shard['node'], "worker-node-5")
+        self.assertTrue(np.array_equal(self.store.open_shard(shard['path']), updated))
+        self.assertFalse(os.path.exists(move.source_path))
+
+    def test_bad_copy_keeps_source(self):
+        self.ring.update(self.nodes + ["worker-node-5"])
+        moves = self.rebalancer.plan()
+        write_shard = self.rebalancer.write_shard
+        self.rebalancer.write_shard = lambda shard, array: write_shard(shard, np.zeros_like(array))
+
+        self.assertEqual(self.rebalancer.run(moves), (0, len(moves)))
+        for move in moves:
+            shard = self.catalog.shards_for_object(move.object_id)[move.shard_index]
+            self.assertEqual(shard['path'], move.source_path)
+            self.assertTrue(os.path.exists(move.source_path))
+        self.assertFalse(os.listdir(os.path.join(self.test_dir, "worker-node-5")))
+
+class TestScrubber(unittest.TestCase):
+    """Shard checksums and background scrubbing (no cluster required)"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.store = ShardStore(self.test_dir)
+        self.catalog = StripeCatalog(os.path.join(self.test_dir, "catalog.db"))
+        self.scrubber = Scrubber(
+            self.catalog,
+            read_shard=lambda shard: self.store.open_shard(shard['path']),
+            write_shard=lambda shard, array: self.store.write_shard(shard['path'], np.array(array)),
+        )
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _store(self, object_id, parity_shards, checksums=True):
+        rng = np.random.default_rng(len(object_id))
+        segments = [rng.integers(0, 256, (12, 5, 3), dtype=np.uint8) for _ in range(3)]
+        shards = segments + ErasureCoder(3, parity_shards).encode(segments)
+        self.catalog.register_object(object_id, 3, parity_shards, shape=(36, 5, 3), dtype="uint8")
+        for index, shard in enumerate(shards):
+            path = self.store.write_shard(os.path.join(self.test_dir, f"worker-node-{index}", f"{object_id}.{index}"), shard)
+            self.catalog.add_shard(object_id, index, f"worker-node-{index}", path,
+                                   checksum=shard_checksum(shard) if checksums else None)
+        return shards
+
+    def _corrupt(self, object_id, index, byte=7):
+        path = os.path.join(self.test_dir, f"worker-node-{index}", f"{object_id}.{index}")
+        shard = np.array(self.store.open_shard(path))
+        shard.reshape(-1)[byte] ^= 0x5A
+        self.store.write_shard(path, shard)
+        return path
+
+    def test_block_checksums_follow_range_updates(self):
+        data = np.arange(1000, dtype=np.uint32).view(np.uint8).copy()
+        checksum = shard_checksum(data, block_size=256)
+        self.assertTrue(verify_checksum(data, checksum))
+        data[600:610] = 0
+        self.assertFalse(verify_checksum(data, checksum))
+        checksum = updated_checksum(checksum, 512, data[512:1024])
+        self.assertTrue(verify_checksum(data, checksum))
+
+    def test_repairs_checksum_failure(self):
+        shards = self._store("a.jpg", 1)
+        path = self._corrupt("a.jpg", 1)
+        self.assertEqual(self.scrubber.scrub_object("a.jpg"), 'repaired')
+        self.assertTrue(np.array_equal(self.store.open_shard(path), shards[1]))
+        self.assertEqual(self.scrubber.scrub_all(), {'clean': 1, 'repaired': 0, 'unrecoverable': 0})
+
+    def test_locates_silent_corruption_without_checksums(self):
+        shards = self._store("b.jpg", 2, checksums=False)
+        path = self._corrupt("b.jpg", 2)
+        self.assertEqual(self.scrubber.scrub_object("b.jpg"), 'repaired')
+        self.assertTrue(np.array_equal(self.store.open_shard(path), shards[2]))
+
+    def test_waits_for_object_updates(self):
+        self._store("e.jpg", 1)
+        results = []
+        with self.scrubber.object_locks["e.jpg"]:
+            scrub = threading.Thread(target=lambda: results.append(self.scrubber.scrub_object("e.jpg")))
+            scrub.start()
+            scrub.join(0.2)
+            self.assertEqual(results, [])
+        scrub.join(5)
+        self.assertEqual(results, ['clean'])
+
+    def test_uncatalogued_missing_shard_is_unrecoverable(self):
+        shards = self._store("f.jpg", 1)
+        self.catalog.remove_object("f.jpg")
+        self.catalog.register_object("f.jpg", 3, 1, shape=(36, 5, 3), dtype="uint8")
+        for index in (0, 1, 3):
+            path = os.path.join(self.test_dir, f"worker-node-{index}", f"f.jpg.{index}")
+            self.catalog.add_shard("f.jpg", index, f"worker-node-{index}", path, checksum=shard_checksum(shards[index]))
+        self.assertEqual(self.scrubber.scrub_object("f.jpg"), 'unrecoverable')
+
+    def test_too_many_bad_shards_is_unrecoverable(self):
+        self._store("c.jpg", 1)
+        self._corrupt("c.jpg", 0)
+        self._corrupt("c.jpg", 3)
+        self.assertEqual(self.scrubber.scrub_object("c.jpg"), 'unrecoverable')
+
+class ClusterTestCase(unittest.TestCase):
+    """A NodeManager with local workers on an in-memory cluster of node_count nodes"""
+
+    node_count = 8
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.backend = FakeClusterBackend(node_count=self.node_count)
+        self.manager = NodeManager(backend=self.backend, storage_path=self.test_dir, reschedule_timeout=5)
+
+    def tearDown(self):
+        self.manager.wait_for_writes(10)
+        self.manager.catalog.close()
+        self.backend.shutdown()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _put_image(self, name, seed=0):
+        path = os.path.join(self.test_dir, name)
+        pixels = np.random.default_rng(seed).integers(0, 256, (48, 40, 3), dtype=np.uint8)
+        Image.fromarray(pixels, 'RGB').save(path)
+        self.assertEqual(self.manager.put_object(path), name)
+        self.assertTrue(self.manager.wait_for_writes(10))
+        return pixels
+
+class TestFakeCluster(ClusterTestCase):
+    """Monitoring and recovery against an in-memory cluster of 200 nodes"""
+
+    node_count = 200
+
+    def setUp(self):
+        super().setUp()
+        self.monitor = NodeMonitor(backend=self.backend, metrics_port=None, manager=self.manager)
+
+    def test_monitor_detects_failed_nodes(self):
+        self.assertEqual(self.monitor.check_node_health(), [])
+        self.backend.fail_node("worker-node-17")
+        self.backend.fail_node("worker-node-150")
+        self.assertEqual(sorted(self.monitor.check_node_health()), ["worker-node-150", "worker-node-17"])
+        self.assertEqual(self.monitor.registry.get_sample_value('node_status', {'node': 'worker-node-17'}), 0)
+        self.assertEqual(len(self.monitor.check_pod_health()), 2)
+
+    def test_node_sweep_lists_nodes_once(self):
+        calls = []
+        list_nodes = self.backend.list_nodes
+        self.backend.list_nodes = lambda *args, **kwargs: calls.append(kwargs) or list_nodes(*args, **kwargs)
+        self.backend.fail_node("worker-node-99")
+        self.assertEqual(self.monitor.check_node_health(), ["worker-node-99"])
+        self.assertEqual(len(calls), 1)
+        self.assertIsNotNone(self.monitor.registry.get_sample_value('node_cpu_usage', {'node': 'worker-node-199'}))
+
+    def test_collects_live_usage(self):
+        self.assertEqual(parse_quantity("250m"), 0.25)
+        self.assertEqual(parse_quantity("1.5Gi"), 1.5 * 2**30)
+        self.assertEqual(parse_quantity("12345678n"), 0.012345678)
+        pod_name = self.backend.list_pods("cloud-storage", field_selector="spec.nodeName=worker-node-5")[0].metadata.name
+        self.backend.set_node_usage("worker-node-5", "1", "4Gi")
+        self.backend.set_pod_usage(pod_name, "250m", "512Mi")
+
+        self.monitor.check_node_health()
+        self.assertEqual(self.monitor.node_usage["worker-node-5"], (25.0, 25.0))
+        self.assertEqual(self.monitor.registry.get_sample_value('node_cpu_usage', {'node': 'worker-node-5'}), 25.0)
+        self.assertEqual(self.monitor.registry.get_sample_value('pod_cpu_usage', {'pod': pod_name}), 0.25)
+        self.assertEqual(self.monitor.registry.get_sample_value('pod_memory_usage', {'pod': pod_name}), 512 * 2**20)
+
+    def test_rebuilt_shards_avoid_busy_nodes(self):
+        self._put_image("f.png")
+        shards = self.manager.catalog.shards_for_object("f.png")
+        failed = shards[0]['node']
+        self.manager.restrict_node_access(failed)
+        ranked = self.manager.refresh_placement().ranked("f.png", exclude={shard['node'] for shard in shards})
+        self.assertEqual(self.manager._recovery_targets("f.png", failed), {0: ranked[0]})
+
+        self.backend.set_node_usage(ranked[0], "3800m", "1Gi")
+        monitor = NodeMonitor(backend=self.backend, metrics_port=None, manager=self.manager)
+        monitor.check_node_health()
+        self.assertEqual(self.manager.node_load[ranked[0]], 95.0)
+        self.assertEqual(self.manager._recovery_targets("f.png", failed), {0: ranked[1]})
+        self.assertEqual(self.manager._spare_nodes("f.png", exclude={failed})[-1], ranked[0])
+
+    def test_recovery_evacuates_failed_node(self):
+        self.backend.fail_node("worker-node-3")
+        self.assertTrue(self.manager.restrict_node_access("worker-node-3"))
+        self.assertTrue(self.manager._perform_recovery("worker-node-3"))
+
+        pods = self.manager.get_worker_pods()
+        self.assertEqual(len(pods), 200)
+        self.assertTrue(all(pod.status.phase == 'Running' for pod in pods))
+        self.assertNotIn("worker-node-3", {pod.spec.node_name for pod in pods})
+        self.assertTrue(self.backend.nodes["worker-node-3"].spec.unschedulable)
+
+    def _watch_recoveries(self, **kwargs):
+        recoveries = queue.Queue()
+        self.monitor.trigger_recovery = lambda nodes: recoveries.put((nodes, time.monotonic()))
+        self.monitor.trigger_pod_recovery = lambda pods: None
+        self.monitor.start_watching(**kwargs)
+        self.addCleanup(self.monitor.stop_watching)
+        deadline = time.monotonic() + 5
+        while len(self.monitor.node_ready) < 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return recoveries
+
+    def test_watch_triggers_recovery_within_a_second(self):
+        recoveries = self._watch_recoveries(watch_timeout=1)
+        failed_at = time.monotonic()
+        self.backend.fail_node("worker-node-42")
+        nodes, triggered_at = recoveries.get(timeout=1)
+        self.assertEqual(nodes, ["worker-node-42"])
+        self.assertLess(triggered_at - failed_at, 1)
+        self.assertEqual(self.monitor.registry.get_sample_value('node_status', {'node': 'worker-node-42'}), 0)
+
+        # Further updates to the node do not trigger again; repair and a new failure do
+        self.manager.restrict_node_access("worker-node-42")
+        self.backend.repair_node("worker-node-42")
+        self.backend.fail_node("worker-node-42")
+        self.assertEqual(recoveries.get(timeout=1)[0], ["worker-node-42"])
+        self.assertTrue(recoveries.empty())
+
+    def test_watch_resumes_after_reconnect(self):
+        recoveries = self._watch_recoveries(watch_timeout=0.2)
+        time.sleep(0.5)
+        self.backend.fail_node("worker-node-7")
+        self.assertEqual(recoveries.get(timeout=1)[0], ["worker-node-7"])
+        self.assertTrue(recoveries.empty())
+
+    def test_watch_follows_bookmarks(self):
+        streams = []
+        watch_nodes = self.backend.watch_nodes
+        self.backend.watch_nodes = lambda **kwargs: streams.append(kwargs['resource_version']) or watch_nodes(**kwargs)
+        recoveries = self._watch_recoveries(watch_timeout=0.5)
+        self.backend.bookmark()
+        bookmark_version = self.backend.resource_version
+        time.sleep(0.8)
+        self.backend.fail_node("worker-node-11")
+        self.assertEqual(recoveries.get(timeout=1)[0], ["worker-node-11"])
+
+        # The stream survived the bookmark and resumed from its version, never relisting
+        self.assertIsNone(streams[0])
+        self.assertEqual(streams[1], str(bookmark_version))
+        self.assertNotIn(None, streams[1:])
+
+    def test_watch_mode_sweeps_usage(self):
+        self.backend.set_node_usage("worker-node-9", "3", "4Gi")
+        self._watch_recoveries(watch_timeout=1, usage_interval=0.1)
+        deadline = time.monotonic() + 5
+        while "worker-node-9" not in self.manager.node_load and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.manager.node_load["worker-node-9"], 75.0)
+        self.assertEqual(self.monitor.registry.get_sample_value('node_cpu_usage', {'node': 'worker-node-9'}), 75.0)
+
+        # Later samples replace the first one
+        self.backend.set_node_usage("worker-node-9", "1", "4Gi")
+        while self.manager.node_load["worker-node-9"] != 25.0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.manager.node_load["worker-node-9"], 25.0)
+
+    def test_expired_resource_version(self):
+        backend = FakeClusterBackend(node_count=3, event_history=3)
+        with self.assertRaises(Exception) as error:
+            list(backend.watch_nodes(resource_version="1", timeout_seconds=0))
+        self.assertEqual(error.exception.status, 410)
+
+    def test_recoveries_share_one_manager(self):
+        monitor = NodeMonitor(backend=self.backend, metrics_port=None, manager=self.manager)
+        submitted = []
+        recover_node = self.manager.recover_node
+        self.manager.recover_node = lambda node: submitted.append(node) or recover_node(node)
+
+        self.backend.fail_node("worker-node-8")
+        for _ in range(3):
+            monitor.trigger_recovery(monitor.check_node_health())
+        self.assertIs(monitor.manager, self.manager)
+        self.assertTrue(monitor.recoveries["worker-node-8"].result(timeout=10))
+        monitor.trigger_recovery(monitor.check_node_health())
+        self.assertEqual(submitted, ["worker-node-8"])
+
+        # Once the node is Ready again, a new failure is recovered again
+        self.backend.repair_node("worker-node-8")
+        monitor.check_node_health()
+        self.backend.fail_node("worker-node-8")
+        monitor.trigger_recovery(monitor.check_node_health())
+        self.assertEqual(submitted, ["worker-node-8", "worker-node-8"])
+        self.assertTrue(monitor.recoveries["worker-node-8"].result(timeout=10))
+
+    def test_failed_node_is_recovered_end_to_end(self):
+        images = {name: self._put_image(name, seed) for seed, name in enumerate(["a.png", "b.png", "c.png"])}
+        node = self.manager.catalog.shards_for_object("a.png")[0]['node']
+        self.assertIn(node, self.backend.nodes)
+        self.assertGreater(self.manager.data_at_risk(node)[1], 0)
+
+        self.backend.fail_node(node)
+        shutil.rmtree(os.path.join(self.test_dir, node))
+        monitor = NodeMonitor(backend=self.backend, metrics_port=None, manager=self.manager)
+        monitor.trigger_recovery(monitor.check_node_health())
+        self.assertTrue(monitor.recoveries[node].result(timeout=30))
+
+        self.assertEqual(self.manager.catalog.objects_on_node(node), [])
+        for name, pixels in images.items():
+            shards = self.manager.catalog.shards_for_object(name)
+            self.assertEqual(len({shard['node'] for shard in shards}), 4)
+            self.assertTrue(all(os.path.exists(shard['path']) for shard in shards))
+            self.assertTrue(np.array_equal(np.asarray(self.manager.get_object(name, repair=False)), pixels))
+
+    def test_failed_write_quorum_leaves_nothing_behind(self):
+        path = os.path.join(self.test_dir, "e.png")
+        Image.fromarray(np.zeros((16, 16, 3), dtype=np.uint8), 'RGB').save(path)
+        nodes = [f"worker-node-{i}" for i in range(4)]
+        write_shard = self.manager.write_shard
+
+        def write(shard, array):
+            if shard['node'] in nodes[:2]:
+                raise ConnectionError(f"No route to {shard['node']}")
+            if shard['node'] == nodes[3]:
+                time.sleep(0.3)
+            return write_shard(shard, array)
+        self.manager.write_shard = write
+
+        self.assertIsNone(self.manager.put_object(path, nodes=nodes))
+        self.assertIsNone(self.manager.catalog.get_object("e.png"))
+        # The straggler lands after the put was abandoned and removes itself
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and any(
+                os.path.exists(self.manager.shard_path(node, "e.png", index)) for index, node in enumerate(nodes)):
+            time.sleep(0.05)
+        for index, node in enumerate(nodes):
+            self.assertFalse(os.path.exists(self.manager.shard_path(node, "e.png", index)))
+        self.assertEqual(self.manager.catalog.shards_for_object("e.png"), [])
+
+    def test_unreachable_worker_only_loses_its_shard(self):
+        self._put_image("d.png")
+        shards = self.manager.catalog.shards_for_object("d.png")
+        unreachable = shards[1]['node']
+        read_shard = self.manager.read_shard
+
+        def read(shard):
+            if shard['node'] == unreachable:
+                raise ConnectionError(f"No route to {unreachable}")
+            return read_shard(shard)
+        self.manager.read_shard = read
+
+        segments = self.manager.get_available_segments("d.png")
+        self.assertEqual(len(segments), 3)
+        self.assertIsNone(segments[1])
+        self.assertIsNotNone(segments[0])
+        self.assertIsNotNone(self.manager.get_parities("d.png")[0])
+
+    def test_scale_workers(self):
+        self.assertTrue(self.manager.scale_workers(250, timeout=5))
+        self.assertEqual(len(self.manager.get_worker_pods()), 250)
+        # Placement is by node (the failure domain), not by pod
+        self.assertEqual(len(self.manager.placement.nodes), 200)
+
+class TestNodeManager(ClusterTestCase):
+    """Object reads, writes and rebuilds on local workers of an in-memory cluster"""
+
+    def _wait_for_repairs(self):
+        # The repair pool has a single worker, so this runs after queued repairs
+        self.manager.repair_pool.submit(lambda: None).result(timeout=10)
+
+    def test_put_returns_at_write_quorum(self):
+        path = os.path.join(self.test_dir, "a.png")
+        Image.fromarray(np.zeros((24, 20, 3), dtype=np.uint8), 'RGB').save(path)
+        nodes = [f"worker-node-{i}" for i in range(4)]
+        release = threading.Event()
+        write_shard = self.manager.write_shard
+
+        def write(shard, array):
+            if shard['node'] == nodes[3]:
+                release.wait(10)
+            return write_shard(shard, array)
+        self.manager.write_shard = write
+
+        self.assertEqual(self.manager.put_object(path, nodes=nodes, write_quorum=3), "a.png")
+        self.assertEqual(len(self.manager.catalog.shards_for_object("a.png")), 3)
+        self.assertFalse(self.manager.wait_for_writes(0.1))
+        release.set()
+        self.assertTrue(self.manager.wait_for_writes(10))
+        shards = self.manager.catalog.shards_for_object("a.png")
+        self.assertEqual([shard['node'] for shard in shards], nodes)
+
+    def test_degraded_read_repairs_in_background(self):
+        pixels = self._put_image("b.png", seed=1)
+        shards = self.manager.catalog.shards_for_object("b.png")
+
+        # A missing shard file on a live node is rewritten in place
+        os.remove(shards[1]['path'])
+        self.assertTrue(np.array_equal(np.asarray(self.manager.get_object("b.png")), pixels))
+        self._wait_for_repairs()
+        self.assertTrue(os.path.exists(shards[1]['path']))
+
+        # A shard on a failed node moves to a node holding none of the object
+        self.manager.restrict_node_access(shards[2]['node'])
+        self.assertTrue(np.array_equal(np.asarray(self.manager.get_object("b.png")), pixels))
+        self._wait_for_repairs()
+        repaired = self.manager.catalog.shards_for_object("b.png")
+        self.assertNotIn(repaired[2]['node'], {shard['node'] for shard in shards})
+        self.assertEqual([shard['node'] for shard in repaired[:2]], [shard['node'] for shard in shards[:2]])
+        os.remove(shards[2]['path'])
+        self.assertTrue(np.array_equal(np.asarray(self.manager.get_object("b.png", repair=False)), pixels))
+
+    def test_repair_keeps_concurrent_update(self):
+        pixels = self._put_image("d.png", seed=4)
+        shards = self.manager.catalog.shards_for_object("d.png")
+        self.manager.restrict_node_access(shards[1]['node'])
+        gate = threading.Event()
+        self.manager.repair_pool.submit(gate.wait, 10)
+
+        # The repair is queued by the degraded read; an update lands before it runs
+        self.assertTrue(np.array_equal(np.asarray(self.manager.get_object("d.png")), pixels))
+        patch = np.full(200, 7, dtype=np.uint8)
+        self.assertTrue(self.manager.update_object("d.png", 2000, patch.tobytes()))
+        gate.set()
+        self._wait_for_repairs()
+
+        expected = pixels.reshape(-1).copy()
+        expected[2000:2200] = patch
+        repaired = self.manager.catalog.shards_for_object("d.png")
+        self.assertNotEqual(repaired[1]['node'], shards[1]['node'])
+        self.assertTrue(np.array_equal(np.asarray(self.manager.get_object("d.png", repair=False)).reshape(-1), expected))
+
+    def test_update_object_keeps_parity_consistent(self):
+        pixels = self._put_image("c.png", seed=2)
+        patch = np.random.default_rng(3).integers(0, 256, 3000, dtype=np.uint8)
+        expected = pixels.reshape(-1).copy()
+        expected[100:3100] = patch
+        expected = expected.reshape(pixels.shape)
+
+        self.assertTrue(self.manager.update_object("c.png", 100, patch.tobytes()))
+        self.assertTrue(np.array_equal(np.asarray(self.manager.get_object("c.png")), expected))
+        shards = [self.manager.read_shard(shard) for shard in self.manager.catalog.shards_for_object("c.png")]
+        parity = ErasureCoder(3, 1).encode([np.array(shard) for shard in shards[:3]])[0]
+        self.assertTrue(np.array_equal(parity, shards[3]))
+
+        # A degraded read decodes the update from the patched parity
+        os.remove(self.manager.catalog.shards_for_object("c.png")[1]['path'])
+        self.assertTrue(np.array_equal(np.asarray(self.manager.get_object("c.png", repair=False)), expected))
+
+    def test_recover_node_data_rebuilds_every_object(self):
+        images = {f"{i}.png": self._put_image(f"{i}.png", seed=i) for i in range(6)}
+        node = self.manager.catalog.shards_for_object("0.png")[3]['node']
+        lost = self.manager.catalog.objects_on_node(node)
+        self.assertGreater(len(lost), 2)
+
+        self.manager.restrict_node_access(node)
+        shutil.rmtree(os.path.join(self.test_dir, node))
+        self.assertTrue(self.manager.recover_node_data(node, prefetch_depth=2))
+
+        self.assertEqual(self.manager.catalog.objects_on_node(node), [])
+        for name, pixels in images.items():
+            shards = self.manager.catalog.shards_for_object(name)
+            self.assertEqual(len({shard['node'] for shard in shards}), 4)
+            self.assertTrue(all(os.path.exists(shard['path']) for shard in shards))
+            self.assertTrue(np.array_equal(np.asarray(self.manager.get_object(name, repair=False)), pixels))
+
+    def test_recover_node_data_skips_unreadable_objects(self):
+        for i in range(6):
+            self._put_image(f"{i}.png", seed=i)
+        node = self.manager.catalog.shards_for_object("0.png")[0]['node']
+        lost = self.manager.catalog.objects_on_node(node)
+        broken = lost[1]
+        get_shard_location = self.manager.get_shard_location
+
+        def locate(image_path, shard_index, stripe=0):
+            if os.path.basename(image_path) == broken:
+                raise RuntimeError("catalog unavailable")
+            return get_shard_location(image_path, shard_index, stripe)
+        self.manager.get_shard_location = locate
+
+        self.manager.restrict_node_access(node)
+        shutil.rmtree(os.path.join(self.test_dir, node))
+        self.assertFalse(self.manager.recover_node_data(node, prefetch_depth=2))
+        # Every other object was still rebuilt
+        self.assertEqual(self.manager.catalog.objects_on_node(node), [broken])
+
+class TestLivenessProber(unittest.TestCase):
+    """Concurrent TCP liveness probes and batched Sensu events"""
+
+    def _listen(self):
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(64)
+        self.addCleanup(server.close)
+        return server.getsockname()[1]
+
+    def _closed_port(self):
+        with socket.socket() as closed:
+            closed.bind(("127.0.0.1", 0))
+            return closed.getsockname()[1]
+
+    def test_probes_all_nodes_concurrently(self):
+        up_port, down_port = self._listen(), self._closed_port()
+        nodes = [{'name': f"node-{i}", 'ip': "127.0.0.1", 'port': up_port if i % 2 else down_port}
+                 for i in range(100)]
+        monitor = LivenessMonitor(nodes, timeout=0.5, jitter=0.1)
+
+        start_time = time.monotonic()
+        status = monitor.monitor_nodes()
+        self.assertLess(time.monotonic() - start_time, 2)
+        self.assertEqual(len(status), 100)
+        self.assertTrue(all(status[f"node-{i}"]['healthy'] == bool(i % 2) for i in range(100)))
+        self.assertTrue(LivenessMonitor([], port=up_port).check_node_health("127.0.0.1"))
+
+    def test_notify_sensu_posts_one_event_per_node(self):
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                received.append((self.path, self.headers['Authorization'], json.loads(body)))
+                self.send_response(201)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        monitor = LivenessMonitor([], sensu_url=f"http://127.0.0.1:{server.server_address[1]}", sensu_api_key="secret")
+        status = {f"node-{i}": {'healthy': i != 3, 'last_checked': time.time()} for i in range(20)}
+        self.assertEqual(monitor.notify_sensu(status), 20)
+        self.assertEqual(len(received), 20)
+        self.assertTrue(all(path == "/api/core/v2/namespaces/default/events" and auth == "Key secret"
+                            for path, auth, _ in received))
+        events = {event['entity']['metadata']['name']: event['check']['status'] for _, _, event in received}
+        self.assertEqual(events["node-3"], 2)
+        self.assertEqual(events["node-4"], 0)
+        self.assertEqual(LivenessMonitor([]).notify_sensu(status), 0)
+
+if __name__ == '__main__':
+    # Setup logging
+    logging.basicConfig(level=logging.INFO)
+    unittest.main()
@@ -76,9 +76,10 @@ def process_single_image(raid_manager, image_path):
         'processing_time': None
     }
     
+    start_time = time.time()
     try:
         # 1. Test RAID 5
-        segments = raid_manager.segment_image(image_path)
+        segments, descriptor = raid_manager.encode_image(image_path)
         parity = raid_manager.calculate_parity_raid5(segments)
         
         # Simulate one segment loss
@@ -87,7 +88,7 @@ def process_single_image(raid_manager, image_path):
         
         # Save and verify
         recovered_path = os.path.join("test_results", f"raid5_{os.path.basename(image_path)}")
-        recovered_full = raid_manager.reconstruct_image(recovered)
+        recovered_full = raid_manager.reconstruct_image(recovered, descriptor)
         raid_manager.save_image(recovered_full, recovered_path)
         
         # Verify recovery (allow up to 20% difference)
@@ -101,7 +102,7 @@ def process_single_image(raid_manager, image_path):
         
         # Save and verify
         recovered_path = os.path.join("test_results", f"raid6_{os.path.basename(image_path)}")
-        recovered_full = raid_manager.reconstruct_image(recovered)
+        recovered_full = raid_manager.reconstruct_image(recovered, descriptor)
         raid_manager.save_image(recovered_full, recovered_path)
         
         # Verify recovery (allow up to 30% difference for RAID 6)
@@ -109,7 +110,6 @@ def process_single_image(raid_manager, image_path):
         results['raid6_success'] = diff < 0.3
         
         # Calculate processing time
-        start_time = time.time()
         results['processing_time'] = time.time() - start_time
         
     except Exception as e: